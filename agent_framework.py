@@ -1,50 +1,673 @@
 import abc
+import bisect
+import copy
+import functools
 import sqlite3
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import math
+import logging
 import os
 import re
 import pandas as pd
+import numpy as np
 import time
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from collections import OrderedDict
+from json_formatter import iter_json_candidates, fast_loads, fast_dumps
+
+logger = logging.getLogger(__name__)
+
+# Parameterized queries, kept as constants so SQLite can reuse the prepared statements.
+# A NULL product or store ID leaves that filter unconstrained.
+_DEMAND_HISTORY_SQL = """
+SELECT * FROM demand_forecasting
+WHERE (? IS NULL OR "Product ID" = ?) AND (? IS NULL OR "Store ID" = ?)
+ORDER BY Date DESC LIMIT 100
+"""
+
+_INVENTORY_SQL = """
+SELECT im.*, df."Sales Quantity", df.Price, df."Demand Trend"
+FROM inventory_monitoring im
+LEFT JOIN demand_forecasting df ON im."Product ID" = df."Product ID" AND im."Store ID" = df."Store ID"
+WHERE (? IS NULL OR im."Product ID" = ?) AND (? IS NULL OR im."Store ID" = ?)
+"""
+
+_PRICING_SQL = """
+SELECT po.*, im."Stock Levels", im."Supplier Lead Time (days)", im."Stockout Frequency", df."Sales Quantity"
+FROM pricing_optimization po
+LEFT JOIN inventory_monitoring im ON po."Product ID" = im."Product ID" AND po."Store ID" = im."Store ID"
+LEFT JOIN demand_forecasting df ON po."Product ID" = df."Product ID" AND po."Store ID" = df."Store ID"
+WHERE (? IS NULL OR po."Product ID" = ?) AND (? IS NULL OR po."Store ID" = ?)
+"""
+
+_SUPPLY_CHAIN_SQL = """
+SELECT *
+FROM inventory_monitoring
+WHERE (? IS NULL OR "Product ID" = ?) AND (? IS NULL OR "Store ID" = ?)
+"""
+
+# First inventory, demand and pricing rows for one product and store in a single statement,
+# used by CoordinatorAgent to prefetch its agents' data. The "__split__" markers separate
+# the three tables' columns; a table without a matching row contributes NULLs. Where a
+# product and store have several rows, the earliest stored one is used.
+_COORDINATOR_ROWS_SQL = """
+SELECT im.*, NULL AS "__split__", df.*, NULL AS "__split__", po.*
+FROM (SELECT ? AS pid, ? AS sid) k
+LEFT JOIN inventory_monitoring im ON im.rowid = (
+    SELECT rowid FROM inventory_monitoring WHERE "Product ID" = k.pid AND "Store ID" = k.sid ORDER BY rowid LIMIT 1)
+LEFT JOIN demand_forecasting df ON df.rowid = (
+    SELECT rowid FROM demand_forecasting WHERE "Product ID" = k.pid AND "Store ID" = k.sid ORDER BY rowid LIMIT 1)
+LEFT JOIN pricing_optimization po ON po.rowid = (
+    SELECT rowid FROM pricing_optimization WHERE "Product ID" = k.pid AND "Store ID" = k.sid ORDER BY rowid LIMIT 1)
+"""
+
+# _COORDINATOR_ROWS_SQL for a batch of (product, store) pairs, one result row per pair in input
+# order; {values} expands to one "(?, ?, ?)" of position, product and store per pair
+_COORDINATOR_BATCH_SQL = """
+WITH k(n, pid, sid) AS (VALUES {values})
+SELECT im.*, NULL AS "__split__", df.*, NULL AS "__split__", po.*
+FROM k
+LEFT JOIN inventory_monitoring im ON im.rowid = (
+    SELECT rowid FROM inventory_monitoring WHERE "Product ID" = k.pid AND "Store ID" = k.sid ORDER BY rowid LIMIT 1)
+LEFT JOIN demand_forecasting df ON df.rowid = (
+    SELECT rowid FROM demand_forecasting WHERE "Product ID" = k.pid AND "Store ID" = k.sid ORDER BY rowid LIMIT 1)
+LEFT JOIN pricing_optimization po ON po.rowid = (
+    SELECT rowid FROM pricing_optimization WHERE "Product ID" = k.pid AND "Store ID" = k.sid ORDER BY rowid LIMIT 1)
+ORDER BY k.n
+"""
+
+# Stock columns for a batch of (product, store) pairs; {values} expands to one "(?, ?)" per pair
+_PORTFOLIO_SQL = """
+WITH pairs(pid, sid) AS (VALUES {values})
+SELECT pairs.pid, pairs.sid, im.rowid, im."Stock Levels", im."Reorder Point",
+       im."Supplier Lead Time (days)", im."Warehouse Capacity"
+FROM pairs
+LEFT JOIN inventory_monitoring im ON im."Product ID" = pairs.pid AND im."Store ID" = pairs.sid
+"""
+# Pairs per batch or portfolio query, keeping bound parameters well under SQLite's limit
+_PORTFOLIO_CHUNK = 400
+
+# Patterns used by Agent.extract_json_from_text, compiled once at import
+_CODE_BLOCK_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```', re.DOTALL)
+_UNQUOTED_KEY_RE = re.compile(r'([{,])\s*(\w+):')
+_TRAIL_OBJ_RE = re.compile(r',\s*}')
+_TRAIL_ARR_RE = re.compile(r',\s*]')
+_NL_IN_STR_RE = re.compile(r'"\s*\n\s*"')
+
+# Prompt templates, filled with str.format_map
+_DEMAND_PROMPT_TMPL = """
+I need a demand forecast for product ID {product_id} at store ID {store_id} for the next {days_ahead} days.
+
+Here is the historical sales data summary:
+{data_summary}
+
+Please provide a predicted demand quantity for the next {days_ahead} days and an explanation of your forecast.
+Consider seasonality, trends, and any external factors.
+Format your response as a JSON with 'forecast_quantity' and 'explanation' fields.
+"""
+
+_INV_PROMPT_TMPL = """
+I need an inventory status analysis for product ID {product_id} at store ID {store_id}.
+
+Here is the inventory and sales data:
+{data_json}
+
+Please analyze the inventory status and provide:
+1. Current stock evaluation (is it adequate, low, critical, etc.)
+2. Risk assessment for stockouts
+3. Detailed description of inventory situation
+4. Specific recommendations for inventory management
+
+Format your response STRICTLY as a plain JSON object with the following structure:
+{{
+  "current_stock": {current_stock},
+  "reorder_point": {reorder_point},
+  "status": "Current inventory status (e.g., Adequate, Low, Critical, Overstock)",
+  "status_code": "status code (e.g., adequate, low, critical, overstock)",
+  "lead_time_days": {lead_time},
+  "stockout_frequency": "Historical frequency of stockouts",
+  "details": "Detailed description of inventory situation",
+  "recommendations": "Specific recommendations for inventory management"
+}}
+
+Ensure your response contains ONLY the JSON object, with no additional text or explanations.
+"""
+
+_PRICING_PROMPT_TMPL = """
+I need pricing optimization recommendations for product ID {product_id} at store ID {store_id}.
+
+Here is the product data:
+{data_json}
+
+Based on current inventory levels, competitor prices, demand, and other factors, please provide:
+1. Recommended optimal price
+2. Recommended discount (if any)
+3. Price elasticity assessment
+4. Expected impact on sales volume
+5. Expected impact on profit
+
+Format your response STRICTLY as a plain JSON object with the following structure:
+{{
+  "optimal_price": "price value",
+  "recommended_discount_percentage": "percentage value",
+  "elasticity_assessment": "assessment text",
+  "expected_sales_impact": "impact description",
+  "expected_profit_impact": "impact description"
+}}
+
+Ensure your response contains ONLY the JSON object, with no additional text or explanations.
+"""
+
+# Bounded pool for SQLite reads issued from async code, so queries never block the event loop
+_DB_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='db')
+
+# Pool the coordinator uses to run its specialized agents concurrently from sync code
+_AGENT_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='agent')
+
+# JSON formatting instructions wrapped around every LLM prompt
+_LLM_PROMPT_PREFIX = "\n"
+_LLM_PROMPT_SUFFIX = """
+
+IMPORTANT: Your response MUST be valid JSON. Wrap your entire response in a valid JSON object. 
+Do not include any text before or after the JSON. Your entire response should be parseable using json.loads().
+
+For the response, ONLY use double quotes (") for strings and keys, never single quotes (').
+Do not include trailing commas in arrays or objects.
+Ensure all keys and string values are properly quoted with double quotes.
+
+Example format:
+{"field1": "value1", "nested_field": {"subfield1": "subvalue1"}, "array_field": ["item1", "item2"]}
+"""
+
+
+# JSON schemas passed as Ollama's "format" option so the model is constrained to valid JSON
+# of the expected shape (structured outputs, Ollama 0.5+); older servers ignore it
+_SUPPLY_CHAIN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "optimal_order_quantity": {"type": "string"},
+        "recommended_order_frequency_days": {"type": "string"},
+        "supplier_performance": {"type": "string"},
+        "warehouse_capacity_status": {"type": "string"},
+        "recommended_actions": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["optimal_order_quantity", "recommended_order_frequency_days", "supplier_performance",
+                 "warehouse_capacity_status", "recommended_actions"]
+}
+
+_COORDINATION_PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "demand_forecast": {"type": "string"},
+        "optimal_inventory_level": {"type": "string"},
+        "pricing_strategy": {"type": "string"},
+        "order_recommendations": {"type": "string"},
+        "key_actions": {"type": "array", "items": {"type": "string"}},
+        "projected_impact": {
+            "type": "object",
+            "properties": {
+                "revenue": {"type": "string"},
+                "costs": {"type": "string"},
+                "profit_margin": {"type": "string"},
+                "stockout_risk": {"type": "string"}
+            },
+            "required": ["revenue", "costs", "profit_margin", "stockout_risk"]
+        }
+    },
+    "required": ["demand_forecast", "optimal_inventory_level", "pricing_strategy", "order_recommendations",
+                 "key_actions", "projected_impact"]
+}
+
+def _id_params(product_id, store_id):
+    """Bind parameters for the product/store filters of the queries above."""
+    product_id = product_id or None
+    store_id = store_id or None
+    return (product_id, product_id, store_id, store_id)
+
+
+def _cache_tag(product_id, store_id):
+    """LLM cache tag for responses derived from a product/store's data."""
+    return (str(product_id), str(store_id))
+
+
+def _row_json(row):
+    """Serialize a single fetched row for embedding in an LLM prompt."""
+    # Non-JSON values such as dates fall back to str() instead of aborting the prompt
+    return fast_dumps([row])
+
+
+def _summarize_numeric(df):
+    """
+    Compact count/mean/std/quantile summary of the numeric columns in df,
+    one line per column. Equivalent to df.describe() without building a
+    stats DataFrame, and shorter once it is in the prompt.
+    """
+    lines = []
+    for column in df.select_dtypes(include=np.number).columns:
+        values = df[column].to_numpy(dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            continue
+        std = values.std(ddof=1) if values.size > 1 else float('nan')
+        q_min, q25, q50, q75, q_max = np.quantile(values, [0, .25, .5, .75, 1.0])
+        lines.append(
+            f"{column}: count={values.size} mean={values.mean():.6g} std={std:.6g} "
+            f"min={q_min:.6g} 25%={q25:.6g} 50%={q50:.6g} 75%={q75:.6g} max={q_max:.6g}"
+        )
+    return "\n".join(lines)
+
+
+class InvStatus(IntEnum):
+    """Inventory status levels; values index into _STATUS_STR and _STATUS_CODE."""
+    OOS = 0
+    CRITICAL = 1
+    LOW = 2
+    ADEQUATE = 3
+    OVERSTOCK = 4
+
+
+_STATUS_STR = ("Out of Stock", "Critical", "Low", "Adequate", "Overstock")
+_STATUS_CODE = ("out_of_stock", "critical", "low", "adequate", "overstock")
+
+# Price elasticity bands returned by _elasticity_band
+_ELASTICITY_TEXT = (
+    "Product is price inelastic; price changes will have minimal impact on demand.",
+    "Product has moderate price elasticity; price changes will affect demand proportionally.",
+    "Product is highly price elastic; price reductions could significantly increase sales volume."
+)
+
+# Supplier ratings by lead-time tier (<= 2, <= 5, <= 10, longer days), three phrasings per tier
+_LEAD_TIME_BOUNDS = (2, 5, 10)
+_SUPPLIER_RATINGS = (
+    ("Excellent - consistently delivers ahead of schedule",
+     "Outstanding - very reliable with quick delivery times",
+     "Excellent - maintains the lowest lead times in the industry"),
+    ("Good - delivers within expected timeframes",
+     "Satisfactory - generally meets delivery commitments",
+     "Reliable - maintains consistent delivery schedules"),
+    ("Average - occasionally experiences delays",
+     "Moderate - lead times are longer than optimal",
+     "Fair - meets minimum requirements but could improve"),
+    ("Poor - frequently experiences significant delays",
+     "Unsatisfactory - lead times are too long",
+     "Needs improvement - consider finding alternative suppliers")
+)
+
+# Warehouse assessments by utilization tier (< 40, < 70, < 90, higher %), formatted with the utilization
+_UTILIZATION_BOUNDS = (40, 70, 90)
+_WAREHOUSE_ASSESSMENTS = (
+    ("Low utilization ({:.0f}%) - capacity for additional inventory",
+     "Under-utilized ({:.0f}%) - consider consolidating storage areas",
+     "Ample space available ({:.0f}%) - can accommodate larger orders"),
+    ("Moderate utilization ({:.0f}%) - good balance of space efficiency",
+     "Optimal utilization ({:.0f}%) - efficient use of warehouse space",
+     "Adequate capacity ({:.0f}%) - can handle normal order volumes"),
+    ("High utilization ({:.0f}%) - approaching capacity limits",
+     "Near capacity ({:.0f}%) - may need to optimize storage",
+     "Efficient but limited ({:.0f}%) - carefully monitor inventory growth"),
+    ("Critical capacity ({:.0f}%) - limited space for new inventory",
+     "Over-utilized ({:.0f}%) - need immediate storage solutions",
+     "At maximum capacity ({:.0f}%) - requires expansion or offsite storage")
+)
+
+
+# Actions closing every supply chain recommendation list
+_GENERAL_SUPPLY_CHAIN_ACTIONS = (
+    "Establish automated reorder points to minimize manual inventory checks",
+    "Conduct quarterly supplier performance reviews to maintain service levels"
+)
+
+def _classify(current_stock, reorder_point):
+    """Classify a stock level against its reorder point."""
+    if current_stock <= 0:
+        return InvStatus.OOS
+    elif current_stock < reorder_point * 0.5:
+        return InvStatus.CRITICAL
+    elif current_stock < reorder_point:
+        return InvStatus.LOW
+    elif current_stock < reorder_point * 2:
+        return InvStatus.ADEQUATE
+    else:
+        return InvStatus.OVERSTOCK
+
+
+def classify_batch(current_stock, reorder_point):
+    """Vectorized _classify over arrays; returns integer InvStatus values."""
+    current_stock = np.asarray(current_stock)
+    reorder_point = np.asarray(reorder_point)
+    conditions = [
+        current_stock <= 0,
+        current_stock < reorder_point * 0.5,
+        current_stock < reorder_point,
+        current_stock < reorder_point * 2
+    ]
+    return np.select(conditions, [0, 1, 2, 3], default=4)
+
+
+def _price_diff_percent(current_price, competitor_price):
+    """Percentage by which the current price exceeds the competitor price."""
+    return ((current_price - competitor_price) / current_price) * 100
+
+
+def _elasticity_band(elasticity):
+    """Classify price elasticity into an index into _ELASTICITY_TEXT."""
+    if elasticity < 1.0:
+        return 0
+    elif elasticity < 1.5:
+        return 1
+    else:
+        return 2
+
+
+@functools.lru_cache(maxsize=4096)
+def _supply_chain_seeds(product_id):
+    """
+    Per-product moduli behind the synthetic supply chain figures, computed once
+    per ID. Returns (stock % 150, reorder % 50, lead time % 7, supplier rating
+    index, warehouse assessment index).
+    """
+    # The supplier seed is product_id % 5 folded onto the three ratings per tier
+    performance_seed = product_id % 5
+    if performance_seed >= 3:
+        performance_seed -= 3
+    return product_id % 150, product_id % 50, product_id % 7, performance_seed, product_id % 3
+
+
+@functools.lru_cache(maxsize=4096)
+def _eoq_synthetic(product_id):
+    """
+    Synthetic EOQ figures for a product, derived from its ID only. Returns
+    (optimal_order_quantity, order_frequency_days, annual_demand,
+    holding_cost_percent, order_cost).
+    """
+    # Calculate optimal order quantity using EOQ formula (simplified)
+    annual_demand = 1200 + (product_id % 1000)
+    holding_cost_percent = 0.2 + (product_id % 10) / 100
+    order_cost = 15 + (product_id % 15)
+    # round(sqrt(2DK / h)) in integers, with h in hundredths: floor(2 * sqrt(x)) == isqrt(4x),
+    # then halve rounding up. Matches the float formula for every product ID.
+    holding_cost_hundredths = 20 + (product_id % 10)
+    optimal_order_quantity = (math.isqrt(800 * annual_demand * order_cost // holding_cost_hundredths) + 1) // 2
+    
+    # Calculate order frequency
+    order_frequency = round(annual_demand / optimal_order_quantity)
+    order_frequency_days = round(365 / order_frequency)
+    
+    return optimal_order_quantity, order_frequency_days, annual_demand, holding_cost_percent, order_cost
+
+
+def _supplier_seed(pids):
+    """Vectorized supplier rating index from _supply_chain_seeds."""
+    seed = pids % 5
+    return np.where(seed >= 3, seed - 3, seed)
+
+
+def _supply_chain_kernel(pids, current_stock=None, lead_time=None, warehouse_capacity=None):
+    """
+    Fused array version of _eoq_synthetic and the supplier/warehouse tiering for
+    SupplyChainAgent.process_batch. Returns (optimal_order_quantity,
+    order_frequency_days, supplier tier index, utilization percent).
+    """
+    annual_demand = 1200 + pids % 1000
+    holding_cost_percent = 0.2 + (pids % 10) / 100.0
+    order_cost = 15 + pids % 15
+    optimal_order_quantity = np.rint(np.sqrt(2 * annual_demand * order_cost / holding_cost_percent)).astype(np.int64)
+    order_frequency_days = np.rint(365.0 / np.rint(annual_demand / optimal_order_quantity)).astype(np.int64)
+    
+    if current_stock is None:
+        current_stock = 50 + pids % 150
+    if lead_time is None:
+        lead_time = 3 + pids % 7
+    if warehouse_capacity is None:
+        warehouse_capacity = 200 + pids % 500
+    supplier_bucket = np.searchsorted(_LEAD_TIME_BOUNDS, lead_time, side='left')
+    utilization = np.asarray(current_stock) / np.asarray(warehouse_capacity) * 100
+    
+    return optimal_order_quantity, order_frequency_days, supplier_bucket, utilization
+
+
+@functools.lru_cache(maxsize=128)
+def _extract_json_cached(text):
+    """
+    Extract JSON from text that might contain other content. Results are
+    memoized on the text, so callers must copy them before handing them out.
+    """
+    logger.debug("Attempting to extract JSON from response: %.50s...", text)
+    
+    if not text:
+        logger.warning("Empty response received")
+        return None
+        
+    stripped = text.strip()
+    
+    # 1. Fast path: the LLM followed the prompt and returned a bare JSON object
+    if stripped.startswith('{') and stripped.endswith('}'):
+        try:
+            return fast_loads(stripped)
+        except json.JSONDecodeError:
+            pass
+    
+    # Without both braces there is no object for the steps below to recover
+    if '{' not in stripped or '}' not in stripped:
+        logger.warning("No JSON object found in the response")
+        return None
+    
+    # 2. Prose around a single object: try the outermost {...} span before scanning.
+    # When it parses it is the longest candidate the scan below could find.
+    start = text.find('{')
+    end = text.rfind('}') + 1
+    if start < end:
+        try:
+            json_obj = fast_loads(text[start:end])
+        except json.JSONDecodeError:
+            json_obj = None
+        if json_obj:
+            logger.debug("Found valid JSON with %d keys", len(json_obj))
+            return json_obj
+    
+    # Otherwise scan for balanced {...} regions and keep the longest one that parses
+    candidates = sorted(iter_json_candidates(text), key=lambda span: span[0] - span[1])
+    for start, end in candidates:
+        try:
+            json_obj = fast_loads(text[start:end])
+        except json.JSONDecodeError:
+            continue
+        if json_obj:
+            logger.debug("Found valid JSON with %d keys", len(json_obj))
+            return json_obj
+            
+    # 3. Find JSON in markdown code blocks
+    code_blocks = _CODE_BLOCK_RE.findall(text)
+    
+    for block in code_blocks:
+        try:
+            json_obj = fast_loads(block.strip())
+            logger.debug("Found valid JSON in code block with %d keys", len(json_obj))
+            return json_obj
+        except json.JSONDecodeError:
+            continue
+    
+    # 4. Try fixing common issues
+    fixed_text = text
+    
+    # Fix unquoted keys
+    fixed_text = _UNQUOTED_KEY_RE.sub(r'\1"\2":', fixed_text)
+    
+    # Fix single quotes
+    fixed_text = fixed_text.replace("'", '"')
+    
+    # Fix trailing commas in arrays and objects
+    fixed_text = _TRAIL_OBJ_RE.sub('}', fixed_text)
+    fixed_text = _TRAIL_ARR_RE.sub(']', fixed_text)
+    
+    # Fix newlines in strings
+    fixed_text = _NL_IN_STR_RE.sub(' ', fixed_text)
+    
+    try:
+        json_obj = fast_loads(fixed_text)
+        logger.debug("Successfully fixed JSON issues, found %d keys", len(json_obj))
+        return json_obj
+    except json.JSONDecodeError:
+        pass
+        
+    # If all attempts fail, return None
+    logger.warning("Could not extract valid JSON from the response")
+    return None
+
+
+class LLMCache:
+    """
+    Thread-safe LRU cache of LLM responses. Entries can expire after ttl
+    seconds and can carry a tag, typically (product_id, store_id), so every
+    response derived from a product's data can be dropped when it changes.
+    """
+    
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (value, expiry time or None, tag)
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(*parts):
+        """Hash the given strings into a compact cache key."""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def get(self, key):
+        """Return a cached value, marking it as recently used, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, tag = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value, tag=None):
+        """Store a value, evicting the least recently used entries."""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, tag)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+    
+    def invalidate(self, tag):
+        """Drop every entry stored with the given tag. Returns the number removed."""
+        with self._lock:
+            keys = self._tags.pop(tag, ())
+            for key in keys:
+                self._entries.pop(key, None)
+            return len(keys)
+    
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _remove(self, key):
+        """Remove an entry and its tag reference; the caller holds the lock."""
+        _, _, tag = self._entries.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+# List collecting why agents fell back in the current computation, set by track_fallbacks.
+# Tasks and to_thread workers inherit it, so one list covers a request's concurrent agents
+_fallbacks = contextvars.ContextVar('fallbacks', default=None)
+
+def _mark_fallback(reason):
+    """Record that the current result was built without a usable LLM response."""
+    fallbacks = _fallbacks.get()
+    if fallbacks is not None:
+        fallbacks.append(reason)
+
+@contextlib.contextmanager
+def track_fallbacks():
+    """
+    Collect the reasons agents fell back to business logic or synthetic data
+    (a failed LLM query, an unparseable response, a database error) while the
+    block runs. Yields the list, empty when every result is a real one.
+    """
+    token = _fallbacks.set([])
+    try:
+        yield _fallbacks.get()
+    finally:
+        _fallbacks.reset(token)
+
+
+def create_llm_session(pool_connections=8, pool_maxsize=16):
+    """Create a pooled keep-alive HTTP session for talking to the LLM service."""
+    session = requests.Session()
+    # Retries are handled by query_llm, so the adapter itself never retries
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=Retry(total=0))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
 
 class Agent(abc.ABC):
     """Base class for all agents in the system."""
     
-    def __init__(self, name, llm_url=None, llm_model=None):
+    # HTTP session shared by every agent so LLM calls reuse pooled keep-alive connections
+    _session = None
+    
+    def __init__(self, name, llm_url=None, llm_model=None, cache_size=256):
         self.name = name
         # Use the specified LLM URL or environment variable, with fallback to the known working URL
         self.llm_url = llm_url or os.environ.get('LLM_URL', 'http://35.154.211.247:11434')
         # Use the specified LLM model or environment variable, with fallback to the known working model
         self.llm_model = llm_model or os.environ.get('LLM_MODEL', 'qwen2.5:0.5b')
         self.messages = []
-        print(f"Agent {name} initialized with LLM URL: {self.llm_url}, model: {self.llm_model}")
+        # LRU cache of LLM responses keyed by a hash of the prompt and model
+        self.cache_size = cache_size
+        self._llm_cache = LLMCache(cache_size)
+        # SQLite connection opened on first use and kept for the lifetime of the agent. A connection
+        # must not run statements from two threads at once, so every use holds the lock
+        self._conn = None
+        self._conn_lock = threading.RLock()
+        if Agent._session is None:
+            Agent._session = create_llm_session()
+        logger.info("Agent %s initialized with LLM URL: %s, model: %s", name, self.llm_url, self.llm_model)
+    
+    def use_session(self, session):
+        """Send this agent's LLM calls through the given HTTP session instead of the shared default."""
+        self._session = session
         
-    def query_llm(self, prompt, max_retries=3, retry_delay=1):
-        """Query the Ollama LLM API with retry logic."""
+    def _build_llm_request(self, prompt, schema=None):
+        """Build the Ollama generate URL and payload for a prompt, optionally constrained to a JSON schema."""
         # Add JSON formatting instructions to every prompt
-        formatted_prompt = f"""
-{prompt}
-
-IMPORTANT: Your response MUST be valid JSON. Wrap your entire response in a valid JSON object. 
-Do not include any text before or after the JSON. Your entire response should be parseable using json.loads().
-
-For the response, ONLY use double quotes (") for strings and keys, never single quotes (').
-Do not include trailing commas in arrays or objects.
-Ensure all keys and string values are properly quoted with double quotes.
-
-Example format:
-{{
-  "field1": "value1",
-  "field2": "value2",
-  "nested_field": {{
-    "subfield1": "subvalue1"
-  }},
-  "array_field": [
-    "item1",
-    "item2"
-  ]
-}}
-"""
+        formatted_prompt = _LLM_PROMPT_PREFIX + prompt + _LLM_PROMPT_SUFFIX
         url = f"{self.llm_url}/api/generate"
         
         payload = {
@@ -52,125 +675,199 @@ Example format:
             "prompt": formatted_prompt,
             "stream": False
         }
+        if schema is not None:
+            payload["format"] = schema
+        return url, payload
+    
+    @staticmethod
+    def _response_text(response):
+        """Extract the generated text from an Ollama response body."""
+        # Parse the raw bytes in one step; response.json() would first sniff the charset and decode to str
+        return fast_loads(response.content).get('response', '')
+    
+    def _llm_cache_key(self, payload):
+        """Hash the formatted prompt, model and any output schema into a compact cache key."""
+        if "format" in payload:
+            return LLMCache.make_key(payload["prompt"], payload["model"], fast_dumps(payload["format"]))
+        return LLMCache.make_key(payload["prompt"], payload["model"])
+    
+    def invalidate_cache(self, product_id, store_id):
+        """Forget cached LLM responses generated from a product's data, e.g. after it changes."""
+        return self._llm_cache.invalidate(_cache_tag(product_id, store_id))
+    
+    @staticmethod
+    def _in_event_loop():
+        """Return True when called from a thread that is running an asyncio event loop."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return True
+    
+    def _prepare_llm_query(self, prompt, cache, schema):
+        """
+        Build the request for a prompt and look it up in the response cache.
+        Returns (url, payload, cache_key, cached response or None).
+        """
+        url, payload = self._build_llm_request(prompt, schema)
+        cache_key = self._llm_cache_key(payload) if cache else None
+        cached = self._llm_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            logger.debug("Using cached LLM response")
+        return url, payload, cache_key, cached
+    
+    def _llm_response_result(self, response, cache_key, cache_tag):
+        """
+        Turn an HTTP response into (text, ok, retryable), caching successful
+        responses. Only server errors are worth retrying.
+        """
+        logger.debug("LLM Response Status: %s", response.status_code)
+        if response.status_code == 200:
+            resp_text = self._response_text(response)
+            logger.debug("LLM Raw Response: %.100s...", resp_text)
+            if cache_key:
+                self._llm_cache.set(cache_key, resp_text, tag=cache_tag)
+            return resp_text, True, False
+        
+        error_msg = f"Error: {response.status_code}, {response.text}"
+        logger.warning(error_msg)
+        return error_msg, False, response.status_code >= 500
+    
+    @staticmethod
+    def _llm_exception_result(e):
+        """Turn a request exception into (text, ok, retryable); only network failures are retried."""
+        error_msg = f"Exception: {str(e)}"
+        logger.warning(error_msg)
+        return error_msg, False, isinstance(e, (requests.ConnectionError, requests.Timeout))
+    
+    def query_llm(self, prompt, max_retries=3, retry_delay=1, cache=True, cache_tag=None, schema=None):
+        """
+        Query the Ollama LLM API with retry logic. A JSON schema passed as schema
+        constrains the response to matching JSON.
+        """
+        if self._in_event_loop():
+            # The blocking HTTP call and time.sleep below would stall every other coroutine
+            logger.warning("%s.query_llm called from a running event loop; use aquery_llm instead", self.name)
+        url, payload, cache_key, cached = self._prepare_llm_query(prompt, cache, schema)
+        if cached is not None:
+            return cached
         
-        attempt = 0
-        while attempt < max_retries:
+        for attempt in range(max_retries):
             try:
                 # Attempt to connect to Ollama LLM
-                print(f"Attempt {attempt+1} to connect to LLM service...")
-                response = requests.post(url, json=payload, timeout=100)
-                
-                # Log the raw response for debugging
-                print(f"LLM Response Status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    resp_text = response.json().get('response', '')
-                    print(f"LLM Raw Response: {resp_text[:100]}...")  # Log first 100 chars
-                    return resp_text
-                else:
-                    error_msg = f"Error: {response.status_code}, {response.text}"
-                    print(error_msg)
-                    attempt += 1
-                    if attempt < max_retries:
-                        print(f"Retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
-                    else:
-                        return error_msg
+                logger.debug("Attempt %d to connect to LLM service...", attempt + 1)
+                response = self._session.post(url, json=payload, timeout=100)
+                text, ok, retryable = self._llm_response_result(response, cache_key, cache_tag)
             except Exception as e:
-                error_msg = f"Exception: {str(e)}"
-                print(error_msg)
-                attempt += 1
-                if attempt < max_retries:
-                    print(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                else:
-                    return error_msg
+                text, ok, retryable = self._llm_exception_result(e)
+            
+            if ok:
+                return text
+            if not retryable or attempt + 1 == max_retries:
+                _mark_fallback(text)
+                return text
+            logger.info("Retrying in %s seconds...", retry_delay)
+            time.sleep(retry_delay)
         
+        _mark_fallback("no LLM attempts")
         return "Error: Failed to connect to LLM service after multiple attempts."
     
-    def extract_json_from_text(self, text):
-        """Extract JSON from text that might contain other content."""
-        print(f"Attempting to extract JSON from response: {text[:50]}...")
-        
-        if not text:
-            print("Empty response received")
-            return None
-            
-        # 1. Try direct JSON parsing first (sometimes LLMs return valid JSON directly)
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
+    async def aquery_llm(self, prompt, max_retries=3, retry_delay=1, cache=True, cache_tag=None, schema=None):
+        """Query the Ollama LLM API without blocking the event loop; see query_llm."""
+        url, payload, cache_key, cached = self._prepare_llm_query(prompt, cache, schema)
+        if cached is not None:
+            return cached
         
-        # 2. Try to extract JSON with regex (finds patterns like {...})
-        json_pattern = r'(\{(?:[^{}]|(?:\{[^{}]*\}))*\})'
-        json_matches = re.finditer(json_pattern, text, re.DOTALL)
-        
-        best_json = None
-        best_json_len = 0
-        
-        for match in json_matches:
-            potential_json = match.group(1)
-            try:
-                json_obj = json.loads(potential_json)
-                # Prefer the longest valid JSON
-                if len(potential_json) > best_json_len:
-                    best_json = json_obj
-                    best_json_len = len(potential_json)
-            except json.JSONDecodeError:
-                continue
-        
-        if best_json:
-            print(f"Found valid JSON with {len(best_json.keys())} keys")
-            return best_json
-                
-        # 3. Find JSON in markdown code blocks
-        code_block_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-        code_blocks = re.findall(code_block_pattern, text, re.DOTALL)
-        
-        for block in code_blocks:
+        for attempt in range(max_retries):
             try:
-                json_obj = json.loads(block.strip())
-                print(f"Found valid JSON in code block with {len(json_obj.keys())} keys")
-                return json_obj
-            except json.JSONDecodeError:
-                continue
-        
-        # 4. Try fixing common issues
-        fixed_text = text
-        
-        # Fix unquoted keys
-        fixed_text = re.sub(r'([{,])\s*(\w+):', r'\1"\2":', fixed_text)
-        
-        # Fix single quotes
-        fixed_text = fixed_text.replace("'", '"')
-        
-        # Fix trailing commas in arrays and objects
-        fixed_text = re.sub(r',\s*}', '}', fixed_text)
-        fixed_text = re.sub(r',\s*]', ']', fixed_text)
-        
-        # Fix newlines in strings
-        fixed_text = re.sub(r'"\s*\n\s*"', ' ', fixed_text)
-        
-        try:
-            json_obj = json.loads(fixed_text)
-            print(f"Successfully fixed JSON issues, found {len(json_obj.keys())} keys")
-            return json_obj
-        except json.JSONDecodeError:
-            pass
+                logger.debug("Attempt %d to connect to LLM service (async)...", attempt + 1)
+                # The pooled session is blocking, so run the request on a worker thread
+                response = await asyncio.to_thread(self._session.post, url, json=payload, timeout=100)
+                text, ok, retryable = self._llm_response_result(response, cache_key, cache_tag)
+            except Exception as e:
+                text, ok, retryable = self._llm_exception_result(e)
             
-        # If all attempts fail, return None
-        print("Could not extract valid JSON from the response")
-        return None
+            if ok:
+                return text
+            if not retryable or attempt + 1 == max_retries:
+                _mark_fallback(text)
+                return text
+            logger.info("Retrying in %s seconds...", retry_delay)
+            await asyncio.sleep(retry_delay)
+        
+        _mark_fallback("no LLM attempts")
+        return "Error: Failed to connect to LLM service after multiple attempts."
+    
+    def extract_json_from_text(self, text):
+        """Extract JSON from text that might contain other content."""
+        # Copy so callers can mutate the result without corrupting the cache
+        return copy.deepcopy(_extract_json_cached(text))
     
     @abc.abstractmethod
     def process(self, data):
         """Process input data and take actions."""
         pass
     
+    async def aprocess(self, *args, **kwargs):
+        """Run process() on a worker thread so several agents can run concurrently."""
+        return await asyncio.to_thread(self.process, *args, **kwargs)
+    
     def connect_to_db(self):
-        """Connect to the SQLite database."""
-        return sqlite3.connect('database/retail_inventory.db')
+        """Return the agent's persistent SQLite connection, opening it on first use."""
+        if self._conn is None:
+            with self._conn_lock:
+                if self._conn is None:
+                    conn = sqlite3.connect('database/retail_inventory.db', check_same_thread=False, isolation_level=None)
+                    # WAL lets concurrent readers proceed; the larger page cache stays warm between calls
+                    for pragma in ('journal_mode=WAL', 'synchronous=NORMAL', 'cache_size=-65536',
+                                   'temp_store=MEMORY', 'mmap_size=268435456'):
+                        conn.execute(f'PRAGMA {pragma}')
+                    self._conn = conn
+        return self._conn
+    
+    def _fetch_one(self, sql, params=()):
+        """Fetch the first row of a query as a column -> value dict, or None when there are no rows."""
+        with self._conn_lock:
+            cursor = self.connect_to_db().execute(sql, params)
+            try:
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                return dict(zip([column[0] for column in cursor.description], row))
+            finally:
+                cursor.close()
+    
+    def _safe_fetch_one(self, sql, params=()):
+        """
+        _fetch_one that reports database failures instead of raising them. Returns
+        (row, None) on success, with row None when nothing matched, and (None, error)
+        when the query failed.
+        """
+        try:
+            return self._fetch_one(sql, params), None
+        except sqlite3.Error as e:
+            return None, e
+    
+    def _read_sql(self, sql, params=()):
+        """Run a query and return (column names, list of row tuples)."""
+        with self._conn_lock:
+            cursor = self.connect_to_db().execute(sql, params)
+            try:
+                return [column[0] for column in cursor.description], cursor.fetchall()
+            finally:
+                cursor.close()
+    
+    async def _aread_sql(self, sql, params=()):
+        """Run _read_sql on the shared DB thread pool without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_DB_POOL, self._read_sql, sql, params)
+    
+    def close_db(self):
+        """Close the agent's SQLite connection if it is open."""
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
 
     def log_message(self, message, role="agent"):
         """Log a message to the agent's message history."""
@@ -197,53 +894,55 @@ class DemandForecastAgent(Agent):
     
     def process(self, product_id=None, store_id=None, days_ahead=30):
         """Generate demand forecast for a product at a store."""
-        conn = self.connect_to_db()
-        
         # Get historical data
-        query = """
-        SELECT * FROM demand_forecasting 
-        WHERE 1=1
-        """
+        columns, rows = self._read_sql(_DEMAND_HISTORY_SQL, _id_params(product_id, store_id))
         
-        if product_id:
-            query += f" AND \"Product ID\" = {product_id}"
-        if store_id:
-            query += f" AND \"Store ID\" = {store_id}"
-            
-        query += " ORDER BY Date DESC LIMIT 100"
-        
-        df = pd.read_sql_query(query, conn)
-        
-        if df.empty:
+        if not rows:
             return {"error": "No data found for the specified product and store"}
         
-        # Prepare data for LLM
-        data_summary = df.describe().to_string()
+        prompt = self._build_prompt(product_id, store_id, days_ahead, pd.DataFrame(rows, columns=columns))
         
-        # Create prompt for the LLM
-        prompt = f"""
-        I need a demand forecast for product ID {product_id} at store ID {store_id} for the next {days_ahead} days.
+        # Query the LLM
+        response = self.query_llm(prompt, cache_tag=_cache_tag(product_id, store_id))
         
-        Here is the historical sales data summary:
-        {data_summary}
+        return self._parse_forecast(product_id, store_id, response)
+    
+    async def aprocess(self, product_id=None, store_id=None, days_ahead=30):
+        """Async variant of process; the DB read and LLM call both yield to the event loop."""
+        columns, rows = await self._aread_sql(_DEMAND_HISTORY_SQL, _id_params(product_id, store_id))
         
-        Please provide a predicted demand quantity for the next {days_ahead} days and an explanation of your forecast.
-        Consider seasonality, trends, and any external factors.
-        Format your response as a JSON with 'forecast_quantity' and 'explanation' fields.
-        """
+        if not rows:
+            return {"error": "No data found for the specified product and store"}
         
-        # Query the LLM
-        response = self.query_llm(prompt)
+        prompt = self._build_prompt(product_id, store_id, days_ahead, pd.DataFrame(rows, columns=columns))
+        response = await self.aquery_llm(prompt, cache_tag=_cache_tag(product_id, store_id))
         
-        try:
-            # Try to parse as JSON
-            forecast_data = self.extract_json_from_text(response)
-            self.log_message(f"Generated forecast for Product {product_id}, Store {store_id}: {forecast_data}")
-            return forecast_data
-        except json.JSONDecodeError:
+        return self._parse_forecast(product_id, store_id, response)
+    
+    def _build_prompt(self, product_id, store_id, days_ahead, df):
+        """Build the forecast prompt from the historical sales data."""
+        # Prepare data for LLM
+        data_summary = _summarize_numeric(df)
+        
+        # Create prompt for the LLM
+        return _DEMAND_PROMPT_TMPL.format_map({
+            "product_id": product_id,
+            "store_id": store_id,
+            "days_ahead": days_ahead,
+            "data_summary": data_summary
+        })
+    
+    def _parse_forecast(self, product_id, store_id, response):
+        """Turn the LLM response into the forecast dict."""
+        # extract_json_from_text handles decode errors itself and returns None on failure
+        forecast_data = self.extract_json_from_text(response)
+        if forecast_data is None:
             # If not valid JSON, return as is
             self.log_message(f"Generated forecast (non-JSON) for Product {product_id}, Store {store_id}: {response}")
+            _mark_fallback("unparseable forecast")
             return {"forecast_quantity": None, "explanation": response}
+        self.log_message(f"Generated forecast for Product {product_id}, Store {store_id}: {forecast_data}")
+        return forecast_data
 
 
 class InventoryMonitorAgent(Agent):
@@ -252,40 +951,32 @@ class InventoryMonitorAgent(Agent):
     def __init__(self):
         super().__init__(name="InventoryMonitorAgent")
     
-    def process(self, product_id=None, store_id=None):
-        """Monitor inventory levels and identify potential issues."""
-        conn = self.connect_to_db()
-        
+    def process(self, product_id=None, store_id=None, row=None):
+        """
+        Monitor inventory levels and identify potential issues. A row prefetched by
+        the coordinator skips the query; an empty row means there is no data.
+        """
         try:
             # Get inventory data
-            query = """
-            SELECT im.*, df."Sales Quantity", df.Price, df."Demand Trend"
-            FROM inventory_monitoring im
-            LEFT JOIN demand_forecasting df ON im."Product ID" = df."Product ID" AND im."Store ID" = df."Store ID"
-            WHERE 1=1
-            """
-            
-            if product_id:
-                query += f" AND im.\"Product ID\" = {product_id}"
-            if store_id:
-                query += f" AND im.\"Store ID\" = {store_id}"
-                
-            df = pd.read_sql_query(query, conn)
+            if row is None:
+                row = self._fetch_one(_INVENTORY_SQL, _id_params(product_id, store_id))
             
             # If no data found, use realistic synthetic data
-            if df.empty:
-                print(f"No inventory data found for Product {product_id}, Store {store_id}. Using synthetic data.")
+            if not row:
+                logger.info("No inventory data found for Product %s, Store %s. Using synthetic data.", product_id, store_id)
                 current_stock = 50 + (int(product_id) % 150)
                 reorder_point = 25 + (int(product_id) % 50)
                 lead_time = 3 + (int(product_id) % 7)
                 stockout_frequency = 0.05 + (int(product_id) % 10) / 100
                 
+                status = _classify(current_stock, reorder_point)
+                
                 # Return fully formed inventory data
                 return {
                     "current_stock": current_stock,
                     "reorder_point": reorder_point,
-                    "status": self._determine_status(current_stock, reorder_point),
-                    "status_code": self._determine_status_code(current_stock, reorder_point),
+                    "status": _STATUS_STR[status],
+                    "status_code": _STATUS_CODE[status],
                     "lead_time_days": lead_time,
                     "stockout_frequency": f"{stockout_frequency:.2%}",
                     "details": f"Inventory for Product {product_id} at Store {store_id} is currently at {current_stock} units with a reorder point of {reorder_point} units.",
@@ -293,42 +984,23 @@ class InventoryMonitorAgent(Agent):
                 }
             
             # If data found, prepare for LLM
-            row = df.iloc[0]
             current_stock = row["Stock Levels"]
             reorder_point = row["Reorder Point"]
             lead_time = row["Supplier Lead Time (days)"]
-            data_json = df.to_json(orient="records")
+            data_json = _row_json(row)
             
             # Create prompt for the LLM
-            prompt = f"""
-            I need an inventory status analysis for product ID {product_id} at store ID {store_id}.
-            
-            Here is the inventory and sales data:
-            {data_json}
-            
-            Please analyze the inventory status and provide:
-            1. Current stock evaluation (is it adequate, low, critical, etc.)
-            2. Risk assessment for stockouts
-            3. Detailed description of inventory situation
-            4. Specific recommendations for inventory management
-
-            Format your response STRICTLY as a plain JSON object with the following structure:
-            {{
-              "current_stock": {current_stock},
-              "reorder_point": {reorder_point},
-              "status": "Current inventory status (e.g., Adequate, Low, Critical, Overstock)",
-              "status_code": "status code (e.g., adequate, low, critical, overstock)",
-              "lead_time_days": {lead_time},
-              "stockout_frequency": "Historical frequency of stockouts",
-              "details": "Detailed description of inventory situation",
-              "recommendations": "Specific recommendations for inventory management"
-            }}
-
-            Ensure your response contains ONLY the JSON object, with no additional text or explanations.
-            """
+            prompt = _INV_PROMPT_TMPL.format_map({
+                "product_id": product_id,
+                "store_id": store_id,
+                "data_json": data_json,
+                "current_stock": current_stock,
+                "reorder_point": reorder_point,
+                "lead_time": lead_time
+            })
             
             # Query the LLM
-            response = self.query_llm(prompt)
+            response = self.query_llm(prompt, cache_tag=_cache_tag(product_id, store_id))
             
             # Try to parse as JSON
             inventory_data = self.extract_json_from_text(response)
@@ -339,15 +1011,15 @@ class InventoryMonitorAgent(Agent):
                 return inventory_data
             else:
                 # If LLM response parsing failed, use real data to create a response
-                print(f"Could not parse LLM response for inventory status. Using actual data to generate response.")
-                status = self._determine_status(current_stock, reorder_point)
-                status_code = self._determine_status_code(current_stock, reorder_point)
+                logger.warning("Could not parse LLM response for inventory status. Using actual data to generate response.")
+                _mark_fallback("unparseable inventory status")
+                status = _classify(current_stock, reorder_point)
                 
                 return {
                     "current_stock": current_stock,
                     "reorder_point": reorder_point,
-                    "status": status,
-                    "status_code": status_code,
+                    "status": _STATUS_STR[status],
+                    "status_code": _STATUS_CODE[status],
                     "lead_time_days": lead_time,
                     "stockout_frequency": f"{row['Stockout Frequency']:.2%}" if 'Stockout Frequency' in row else "Unknown",
                     "details": f"Inventory for Product {product_id} at Store {store_id} is currently at {current_stock} units with a reorder point of {reorder_point} units.",
@@ -356,60 +1028,70 @@ class InventoryMonitorAgent(Agent):
                 
         except Exception as e:
             # If DB query fails, use synthetic data
-            print(f"Error processing inventory status: {str(e)}")
+            logger.error("Error processing inventory status: %s", e)
+            _mark_fallback(str(e))
             current_stock = 50 + (int(product_id) % 150)
             reorder_point = 25 + (int(product_id) % 50)
             lead_time = 3 + (int(product_id) % 7)
             
-            status = self._determine_status(current_stock, reorder_point)
-            status_code = self._determine_status_code(current_stock, reorder_point)
+            status = _classify(current_stock, reorder_point)
             
             return {
                 "current_stock": current_stock,
                 "reorder_point": reorder_point,
-                "status": status,
-                "status_code": status_code,
+                "status": _STATUS_STR[status],
+                "status_code": _STATUS_CODE[status],
                 "lead_time_days": lead_time,
                 "stockout_frequency": "Unknown",
                 "details": f"Inventory for Product {product_id} at Store {store_id} is currently at {current_stock} units with a reorder point of {reorder_point} units.",
                 "recommendations": self._generate_recommendations(current_stock, reorder_point, lead_time)
             }
             
-    def _determine_status(self, current_stock, reorder_point):
-        """Determine inventory status based on stock level and reorder point."""
-        if current_stock <= 0:
-            return "Out of Stock"
-        elif current_stock < reorder_point * 0.5:
-            return "Critical"
-        elif current_stock < reorder_point:
-            return "Low"
-        elif current_stock < reorder_point * 2:
-            return "Adequate"
-        else:
-            return "Overstock"
-            
-    def _determine_status_code(self, current_stock, reorder_point):
-        """Determine inventory status code based on stock level and reorder point."""
-        if current_stock <= 0:
-            return "out_of_stock"
-        elif current_stock < reorder_point * 0.5:
-            return "critical"
-        elif current_stock < reorder_point:
-            return "low"
-        elif current_stock < reorder_point * 2:
-            return "adequate"
-        else:
-            return "overstock"
+    def process_batch(self, soa):
+        """Classify inventory status for a column-oriented batch (see CoordinatorAgent.process_portfolio)."""
+        return {"status": classify_batch(soa["current_stock"], soa["reorder_point"])}
+    
+    def process_many(self, product_ids, store_ids):
+        """
+        Generate synthetic inventory status for many (product_id, store_id) pairs
+        in one vectorized pass. Intended for seeding dashboards, so no database or
+        LLM calls are made.
+        """
+        pids = np.asarray(product_ids, dtype=np.int64)
+        current = 50 + (pids % 150)
+        reorder = 25 + (pids % 50)
+        lead = 3 + (pids % 7)
+        stockout = 0.05 + (pids % 10) / 100.0
+        
+        status = classify_batch(current, reorder)
+        
+        return [
+            {
+                "current_stock": c,
+                "reorder_point": r,
+                "status": _STATUS_STR[st],
+                "status_code": _STATUS_CODE[st],
+                "lead_time_days": lt,
+                "stockout_frequency": f"{sf:.2%}",
+                "details": f"Inventory for Product {pid} at Store {sid} is currently at {c} units with a reorder point of {r} units.",
+                "recommendations": self._generate_recommendations(c, r, lt)
+            }
+            for pid, sid, c, r, lt, sf, st in zip(
+                pids.tolist(), list(store_ids), current.tolist(), reorder.tolist(), lead.tolist(),
+                stockout.tolist(), status.tolist()
+            )
+        ]
             
     def _generate_recommendations(self, current_stock, reorder_point, lead_time):
         """Generate inventory management recommendations based on status."""
-        if current_stock <= 0:
+        status = _classify(current_stock, reorder_point)
+        if status == InvStatus.OOS:
             return f"Place an emergency order immediately. Consider expedited shipping to reduce stockout duration. Review lead time with suppliers - current lead time is {lead_time} days."
-        elif current_stock < reorder_point * 0.5:
+        elif status == InvStatus.CRITICAL:
             return f"Place an order immediately for at least {reorder_point * 2 - current_stock} units. Monitor daily until new stock arrives in approximately {lead_time} days."
-        elif current_stock < reorder_point:
+        elif status == InvStatus.LOW:
             return f"Place a standard order for {reorder_point * 2 - current_stock} units within the next 1-2 days. Current lead time is {lead_time} days."
-        elif current_stock < reorder_point * 2:
+        elif status == InvStatus.ADEQUATE:
             return f"Inventory levels are adequate. No immediate action required. Next review in {lead_time/2} days."
         else:
             return f"Inventory levels are higher than optimal. Consider running promotions to reduce stock or adjusting reorder point upward from current {reorder_point} units."
@@ -421,30 +1103,19 @@ class PricingOptimizationAgent(Agent):
     def __init__(self):
         super().__init__(name="PricingOptimizationAgent")
     
-    def process(self, product_id=None, store_id=None):
-        """Optimize pricing for a product at a store."""
-        conn = self.connect_to_db()
-        
+    def process(self, product_id=None, store_id=None, row=None):
+        """
+        Optimize pricing for a product at a store. A row prefetched by the
+        coordinator skips the query; an empty row means there is no data.
+        """
         try:
             # Get pricing data
-            query = """
-            SELECT po.*, im."Stock Levels", im."Supplier Lead Time (days)", im."Stockout Frequency", df."Sales Quantity"
-            FROM pricing_optimization po
-            LEFT JOIN inventory_monitoring im ON po."Product ID" = im."Product ID" AND po."Store ID" = im."Store ID"
-            LEFT JOIN demand_forecasting df ON po."Product ID" = df."Product ID" AND po."Store ID" = df."Store ID"
-            WHERE 1=1
-            """
-            
-            if product_id:
-                query += f" AND po.\"Product ID\" = {product_id}"
-            if store_id:
-                query += f" AND po.\"Store ID\" = {store_id}"
-                
-            df = pd.read_sql_query(query, conn)
+            if row is None:
+                row = self._fetch_one(_PRICING_SQL, _id_params(product_id, store_id))
             
             # If no data found, use synthetic data
-            if df.empty:
-                print(f"No pricing data found for Product {product_id}, Store {store_id}. Using synthetic data.")
+            if not row:
+                logger.info("No pricing data found for Product %s, Store %s. Using synthetic data.", product_id, store_id)
                 
                 # Generate realistic pricing data based on product ID
                 current_price = 19.99 + (int(product_id) % 50)
@@ -462,56 +1133,36 @@ class PricingOptimizationAgent(Agent):
             
             # If data found, prepare for LLM
             try:
-                row = df.iloc[0]
                 # Use the correct column names from the database
                 current_price = row["Price"] if "Price" in row else 19.99 + (int(product_id) % 50)
                 competitor_price = row["Competitor Prices"] if "Competitor Prices" in row else current_price * (0.9 + (int(product_id) % 20) / 100)
                 
                 # Calculate margin as we don't have a direct margin column
                 # Assume a default 30% margin if storage cost is not available for calculation
-                if "Storage Cost" in row and row["Storage Cost"] > 0:
+                if row.get("Storage Cost") is not None and row["Storage Cost"] > 0:
                     cost = row["Storage Cost"]
                     margin = ((current_price - cost) / current_price) * 100
                 else:
                     margin = 30 + (int(product_id) % 15)  # Use a realistic synthetic margin
                     
-                data_json = df.to_json(orient="records")
+                data_json = _row_json(row)
             except Exception as e:
-                print(f"Error extracting row data: {str(e)}")
+                logger.error("Error extracting row data: %s", e)
                 # Fall back to synthetic data
                 current_price = 19.99 + (int(product_id) % 50)
                 competitor_price = current_price * (0.9 + (int(product_id) % 20) / 100)
                 margin = 30 + (int(product_id) % 15)
-                data_json = json.dumps([{"Price": current_price, "Competitor Prices": competitor_price}])
+                data_json = fast_dumps([{"Price": current_price, "Competitor Prices": competitor_price}])
             
             # Create prompt for the LLM
-            prompt = f"""
-            I need pricing optimization recommendations for product ID {product_id} at store ID {store_id}.
-            
-            Here is the product data:
-            {data_json}
-            
-            Based on current inventory levels, competitor prices, demand, and other factors, please provide:
-            1. Recommended optimal price
-            2. Recommended discount (if any)
-            3. Price elasticity assessment
-            4. Expected impact on sales volume
-            5. Expected impact on profit
-
-            Format your response STRICTLY as a plain JSON object with the following structure:
-            {{
-              "optimal_price": "price value",
-              "recommended_discount_percentage": "percentage value",
-              "elasticity_assessment": "assessment text",
-              "expected_sales_impact": "impact description",
-              "expected_profit_impact": "impact description"
-            }}
-
-            Ensure your response contains ONLY the JSON object, with no additional text or explanations.
-            """
+            prompt = _PRICING_PROMPT_TMPL.format_map({
+                "product_id": product_id,
+                "store_id": store_id,
+                "data_json": data_json
+            })
             
             # Query the LLM
-            response = self.query_llm(prompt)
+            response = self.query_llm(prompt, cache_tag=_cache_tag(product_id, store_id))
             
             # Try to parse as JSON
             pricing_recommendations = self.extract_json_from_text(response)
@@ -522,7 +1173,8 @@ class PricingOptimizationAgent(Agent):
                 return pricing_recommendations
             else:
                 # If LLM response failed, generate recommendations using business logic
-                print(f"Could not parse LLM response for pricing. Using business logic to generate recommendations.")
+                logger.warning("Could not parse LLM response for pricing. Using business logic to generate recommendations.")
+                _mark_fallback("unparseable pricing")
                 demand_elasticity = 1.2 + (int(product_id) % 10) / 10
                 
                 return {
@@ -535,7 +1187,8 @@ class PricingOptimizationAgent(Agent):
                 
         except Exception as e:
             # If DB query fails, use synthetic data
-            print(f"Error processing pricing optimization: {str(e)}")
+            logger.error("Error processing pricing optimization: %s", e)
+            _mark_fallback(str(e))
             
             # Generate realistic pricing data based on product ID
             current_price = 19.99 + (int(product_id) % 50)
@@ -551,12 +1204,36 @@ class PricingOptimizationAgent(Agent):
                 "expected_profit_impact": self._estimate_profit_impact(current_price, competitor_price, margin, demand_elasticity)
             }
     
+    def process_many(self, product_ids, store_ids):
+        """
+        Generate synthetic pricing recommendations for many (product_id, store_id)
+        pairs in one vectorized pass, without database or LLM calls.
+        """
+        pids = np.asarray(product_ids, dtype=np.int64)
+        current_price = 19.99 + (pids % 50)
+        competitor_price = current_price * (0.9 + (pids % 20) / 100)
+        margin = 30 + (pids % 15)
+        demand_elasticity = 1.2 + (pids % 10) / 10
+        
+        return [
+            {
+                "optimal_price": f"${cp:.2f}",
+                "recommended_discount_percentage": self._calculate_discount(cp, comp),
+                "elasticity_assessment": f"Price elasticity estimated at {el:.2f}. {self._interpret_elasticity(el)}",
+                "expected_sales_impact": self._estimate_sales_impact(cp, comp, el),
+                "expected_profit_impact": self._estimate_profit_impact(cp, comp, m, el)
+            }
+            for cp, comp, m, el in zip(
+                current_price.tolist(), competitor_price.tolist(), margin.tolist(), demand_elasticity.tolist()
+            )
+        ]
+    
     def _calculate_discount(self, current_price, competitor_price):
         """Calculate recommended discount based on competitor pricing."""
         if current_price <= competitor_price:
             return "0% (No discount needed)"
         
-        discount_percentage = ((current_price - competitor_price) / current_price) * 100
+        discount_percentage = _price_diff_percent(current_price, competitor_price)
         if discount_percentage < 5:
             return "0% (No discount needed)"
         elif discount_percentage > 20:
@@ -566,16 +1243,11 @@ class PricingOptimizationAgent(Agent):
     
     def _interpret_elasticity(self, elasticity):
         """Interpret price elasticity value."""
-        if elasticity < 1.0:
-            return "Product is price inelastic; price changes will have minimal impact on demand."
-        elif elasticity < 1.5:
-            return "Product has moderate price elasticity; price changes will affect demand proportionally."
-        else:
-            return "Product is highly price elastic; price reductions could significantly increase sales volume."
+        return _ELASTICITY_TEXT[_elasticity_band(elasticity)]
     
     def _estimate_sales_impact(self, current_price, competitor_price, elasticity):
         """Estimate impact on sales based on pricing factors."""
-        price_diff_percent = ((current_price - competitor_price) / current_price) * 100
+        price_diff_percent = _price_diff_percent(current_price, competitor_price)
         
         if price_diff_percent <= 0:
             return "No change to slight increase in sales volume expected."
@@ -591,7 +1263,7 @@ class PricingOptimizationAgent(Agent):
     
     def _estimate_profit_impact(self, current_price, competitor_price, margin, elasticity):
         """Estimate impact on profit based on pricing factors."""
-        price_diff_percent = ((current_price - competitor_price) / current_price) * 100
+        price_diff_percent = _price_diff_percent(current_price, competitor_price)
         
         if price_diff_percent <= 0:
             return "Expected to maintain current profit levels."
@@ -611,92 +1283,74 @@ class PricingOptimizationAgent(Agent):
 class SupplyChainAgent(Agent):
     """Agent responsible for managing the supply chain and ordering."""
     
+    # Instructions shared by every supply chain prompt; per-product data is appended after it
+    _PROMPT_PREFIX = """
+I need supply chain recommendations for the product and store identified at the end of this message.
+
+Please analyze the inventory and supply chain data given there and provide:
+1. Optimal order quantity
+2. Recommended order frequency
+3. Supplier performance assessment
+4. Warehouse capacity utilization
+5. Recommended actions to improve supply chain efficiency
+
+Format your response STRICTLY as a plain JSON object with the following structure:
+{
+  "optimal_order_quantity": "quantity value",
+  "recommended_order_frequency_days": "frequency in days",
+  "supplier_performance": "performance assessment",
+  "warehouse_capacity_status": "capacity assessment",
+  "recommended_actions": ["action1", "action2", "action3"]
+}
+
+Ensure your response contains ONLY the JSON object, with no additional text or explanations.
+"""
+    # Full prompt, filled with str.format_map; the prefix's literal braces are escaped once here
+    _PROMPT_TMPL = (_PROMPT_PREFIX.replace("{", "{{").replace("}", "}}")
+                    + "\nProduct ID: {product_id}\nStore ID: {store_id}\nInventory and supply chain data:\n{data_json}\n")
+    
     def __init__(self):
         super().__init__(name="SupplyChainAgent")
     
-    def process(self, product_id=None, store_id=None):
-        """Process supply chain data and recommend ordering actions."""
-        conn = self.connect_to_db()
+    def process(self, product_id=None, store_id=None, row=None):
+        """
+        Process supply chain data and recommend ordering actions. A row prefetched
+        by the coordinator skips the query; an empty row means there is no data.
+        """
+        # Get supply chain data; a failing database is reported, not raised, so this common
+        # fallback does not pay for exception unwinding
+        if row is None:
+            row, error = self._safe_fetch_one(_SUPPLY_CHAIN_SQL, _id_params(product_id, store_id))
+            if error is not None:
+                logger.error("Error processing supply chain recommendations: %s", error)
+                _mark_fallback(str(error))
+                return self._synthetic_supply_chain(product_id)
         
-        try:
-            # Get supply chain data
-            query = """
-            SELECT *
-            FROM inventory_monitoring
-            WHERE 1=1
-            """
-            
-            if product_id:
-                query += f" AND \"Product ID\" = {product_id}"
-            if store_id:
-                query += f" AND \"Store ID\" = {store_id}"
-                
-            df = pd.read_sql_query(query, conn)
-            
-            # If no data found, use synthetic data
-            if df.empty:
-                print(f"No supply chain data found for Product {product_id}, Store {store_id}. Using synthetic data.")
-                
-                # Generate realistic supply chain data based on product ID
-                current_stock = 50 + (int(product_id) % 150)
-                reorder_point = 25 + (int(product_id) % 50)
-                lead_time = 3 + (int(product_id) % 7)
-                
-                # Calculate optimal order quantity using EOQ formula (simplified)
-                annual_demand = 1200 + (int(product_id) % 1000)
-                holding_cost_percent = 0.2 + (int(product_id) % 10) / 100
-                order_cost = 15 + (int(product_id) % 15)
-                optimal_order_quantity = round(((2 * annual_demand * order_cost) / holding_cost_percent) ** 0.5)
-                
-                # Calculate order frequency
-                order_frequency = round(annual_demand / optimal_order_quantity)
-                order_frequency_days = round(365 / order_frequency)
-                
-                return {
-                    "optimal_order_quantity": f"{optimal_order_quantity} units",
-                    "recommended_order_frequency_days": f"{order_frequency_days} days",
-                    "supplier_performance": self._assess_supplier_performance(lead_time, product_id),
-                    "warehouse_capacity_status": self._assess_warehouse_capacity(current_stock, optimal_order_quantity, product_id),
-                    "recommended_actions": self._generate_supply_chain_actions(current_stock, reorder_point, lead_time, optimal_order_quantity)
-                }
+        # If no data found, use synthetic data
+        if not row:
+            logger.info("No supply chain data found for Product %s, Store %s. Using synthetic data.", product_id, store_id)
             
+            return self._synthetic_supply_chain(product_id)
+        
+        try:
             # If data found, prepare for LLM
-            row = df.iloc[0]
             current_stock = row["Stock Levels"]
             reorder_point = row["Reorder Point"]
             lead_time = row["Supplier Lead Time (days)"]
-            data_json = df.to_json(orient="records")
-            
-            # Create prompt for the LLM
-            prompt = f"""
-            I need supply chain recommendations for product ID {product_id} at store ID {store_id}.
-            
-            Here is the inventory and supply chain data:
-            {data_json}
+            data_json = _row_json(row)
             
-            Please analyze the data and provide:
-            1. Optimal order quantity
-            2. Recommended order frequency
-            3. Supplier performance assessment
-            4. Warehouse capacity utilization
-            5. Recommended actions to improve supply chain efficiency
-
-            Format your response STRICTLY as a plain JSON object with the following structure:
-            {{
-              "optimal_order_quantity": "quantity value",
-              "recommended_order_frequency_days": "frequency in days",
-              "supplier_performance": "performance assessment",
-              "warehouse_capacity_status": "capacity assessment",
-              "recommended_actions": ["action1", "action2", "action3"]
-            }}
-
-            Ensure your response contains ONLY the JSON object, with no additional text or explanations.
-            """
+            # Static instructions first so the LLM server can reuse its cached prefix; IDs and data go last
+            prompt = self._PROMPT_TMPL.format_map({
+                "product_id": product_id,
+                "store_id": store_id,
+                "data_json": data_json
+            })
             
             # Query the LLM
-            response = self.query_llm(prompt)
+            response = self.query_llm(prompt, cache_tag=_cache_tag(product_id, store_id), schema=_SUPPLY_CHAIN_SCHEMA)
             
-            # Try to parse as JSON
+            # Try to parse as JSON; a schema-constrained reply is a bare object and takes the
+            # parser's fast path, the extraction steps only matter for servers without "format"
             supply_chain_recommendations = self.extract_json_from_text(response)
             
             # If we got a valid response, return it
@@ -705,104 +1359,90 @@ class SupplyChainAgent(Agent):
                 return supply_chain_recommendations
             else:
                 # If LLM response failed, generate recommendations using business logic
-                print(f"Could not parse LLM response for supply chain. Using business logic to generate recommendations.")
+                logger.warning("Could not parse LLM response for supply chain. Using business logic to generate recommendations.")
+                _mark_fallback("unparseable supply chain")
                 
-                # Calculate optimal order quantity using EOQ formula (simplified)
-                annual_demand = 1200 + (int(product_id) % 1000)
-                holding_cost_percent = 0.2 + (int(product_id) % 10) / 100
-                order_cost = 15 + (int(product_id) % 15)
-                optimal_order_quantity = round(((2 * annual_demand * order_cost) / holding_cost_percent) ** 0.5)
-                
-                # Calculate order frequency
-                order_frequency = round(annual_demand / optimal_order_quantity)
-                order_frequency_days = round(365 / order_frequency)
-                
-                return {
-                    "optimal_order_quantity": f"{optimal_order_quantity} units",
-                    "recommended_order_frequency_days": f"{order_frequency_days} days",
-                    "supplier_performance": self._assess_supplier_performance(lead_time, product_id),
-                    "warehouse_capacity_status": self._assess_warehouse_capacity(current_stock, optimal_order_quantity, product_id),
-                    "recommended_actions": self._generate_supply_chain_actions(current_stock, reorder_point, lead_time, optimal_order_quantity)
-                }
+                return self._synthetic_supply_chain(product_id, current_stock, reorder_point, lead_time,
+                                                    row.get("Warehouse Capacity"))
                 
         except Exception as e:
-            # If DB query fails, use synthetic data
-            print(f"Error processing supply chain recommendations: {str(e)}")
-            
-            # Generate realistic supply chain data based on product ID
-            current_stock = 50 + (int(product_id) % 150)
-            reorder_point = 25 + (int(product_id) % 50)
-            lead_time = 3 + (int(product_id) % 7)
+            # Malformed data or an unexpected LLM failure, use synthetic data
+            logger.error("Error processing supply chain recommendations: %s", e)
+            _mark_fallback(str(e))
             
-            # Calculate optimal order quantity using EOQ formula (simplified)
-            annual_demand = 1200 + (int(product_id) % 1000)
-            holding_cost_percent = 0.2 + (int(product_id) % 10) / 100
-            order_cost = 15 + (int(product_id) % 15)
-            optimal_order_quantity = round(((2 * annual_demand * order_cost) / holding_cost_percent) ** 0.5)
-            
-            # Calculate order frequency
-            order_frequency = round(annual_demand / optimal_order_quantity)
-            order_frequency_days = round(365 / order_frequency)
-            
-            return {
-                "optimal_order_quantity": f"{optimal_order_quantity} units",
-                "recommended_order_frequency_days": f"{order_frequency_days} days",
-                "supplier_performance": self._assess_supplier_performance(lead_time, product_id),
-                "warehouse_capacity_status": self._assess_warehouse_capacity(current_stock, optimal_order_quantity, product_id),
-                "recommended_actions": self._generate_supply_chain_actions(current_stock, reorder_point, lead_time, optimal_order_quantity)
-            }
+            return self._synthetic_supply_chain(product_id)
+    
+    def _synthetic_supply_chain(self, product_id, current_stock=None, reorder_point=None, lead_time=None,
+                                warehouse_capacity=None):
+        """
+        Build supply chain recommendations with business logic instead of the LLM.
+        Stock, reorder point, lead time and warehouse capacity default to synthetic
+        values derived from the product ID when real ones are not supplied.
+        """
+        product_id = int(product_id)
+        stock_mod, reorder_mod, lead_mod, _, _ = _supply_chain_seeds(product_id)
+        if current_stock is None:
+            current_stock = 50 + stock_mod
+        if reorder_point is None:
+            reorder_point = 25 + reorder_mod
+        if lead_time is None:
+            lead_time = 3 + lead_mod
+        
+        # Optimal order quantity and order frequency from the (simplified) EOQ formula
+        optimal_order_quantity, order_frequency_days, *_ = _eoq_synthetic(product_id)
+        
+        return {
+            "optimal_order_quantity": f"{optimal_order_quantity} units",
+            "recommended_order_frequency_days": f"{order_frequency_days} days",
+            "supplier_performance": self._assess_supplier_performance(lead_time, product_id),
+            "warehouse_capacity_status": self._assess_warehouse_capacity(current_stock, optimal_order_quantity, product_id,
+                                                                         warehouse_capacity),
+            "recommended_actions": self._generate_supply_chain_actions(current_stock, reorder_point, lead_time, optimal_order_quantity)
+        }
+    
+    def process_batch(self, product_ids, store_ids, current_stock=None, lead_time=None, warehouse_capacity=None):
+        """
+        Compute the synthetic EOQ figures and assessments for many (product_id, store_id)
+        pairs at once. Stock, lead time and warehouse capacity arrays default to the
+        synthetic values used by _synthetic_supply_chain. Returns a dict of NumPy
+        arrays plus lists of assessment strings.
+        """
+        pids = np.asarray(product_ids, dtype=np.int64)
+        (optimal_order_quantity, order_frequency_days,
+         supplier_bucket, utilization) = _supply_chain_kernel(pids, current_stock, lead_time, warehouse_capacity)
+        utilization_bucket = np.searchsorted(_UTILIZATION_BOUNDS, utilization, side='right')
+        
+        # Strings are gathered from the tier tables after the numeric work is done
+        return {
+            "product_id": pids,
+            "store_id": np.asarray(store_ids),
+            "optimal_order_quantity": optimal_order_quantity,
+            "recommended_order_frequency_days": order_frequency_days,
+            "supplier_performance": [
+                _SUPPLIER_RATINGS[bucket][seed]
+                for bucket, seed in zip(supplier_bucket.tolist(), _supplier_seed(pids).tolist())
+            ],
+            "warehouse_capacity_status": [
+                _WAREHOUSE_ASSESSMENTS[bucket][seed].format(value)
+                for bucket, seed, value in zip(utilization_bucket.tolist(), (pids % 3).tolist(), utilization.tolist())
+            ]
+        }
     
     def _assess_supplier_performance(self, lead_time, product_id):
         """Assess supplier performance based on lead time and product specifics."""
-        performance_seed = (int(product_id) % 5)  # 0-4 to add variability
-        
-        if lead_time <= 2:
-            ratings = ["Excellent - consistently delivers ahead of schedule", 
-                       "Outstanding - very reliable with quick delivery times",
-                       "Excellent - maintains the lowest lead times in the industry"]
-            return ratings[performance_seed % len(ratings)]
-        elif lead_time <= 5:
-            ratings = ["Good - delivers within expected timeframes", 
-                       "Satisfactory - generally meets delivery commitments",
-                       "Reliable - maintains consistent delivery schedules"]
-            return ratings[performance_seed % len(ratings)]
-        elif lead_time <= 10:
-            ratings = ["Average - occasionally experiences delays", 
-                       "Moderate - lead times are longer than optimal",
-                       "Fair - meets minimum requirements but could improve"]
-            return ratings[performance_seed % len(ratings)]
-        else:
-            ratings = ["Poor - frequently experiences significant delays", 
-                       "Unsatisfactory - lead times are too long",
-                       "Needs improvement - consider finding alternative suppliers"]
-            return ratings[performance_seed % len(ratings)]
-    
-    def _assess_warehouse_capacity(self, current_stock, optimal_order_quantity, product_id):
-        """Assess warehouse capacity based on current stock and optimal order quantity."""
-        utilization_seed = (int(product_id) % 3)  # 0-2 to add variability
-        total_capacity = current_stock * 3  # Assume storage capacity is roughly 3x current stock
-        utilization = (current_stock / total_capacity) * 100
-        
-        if utilization < 40:
-            assessments = [f"Low utilization ({round(utilization)}%) - capacity for additional inventory", 
-                          f"Under-utilized ({round(utilization)}%) - consider consolidating storage areas",
-                          f"Ample space available ({round(utilization)}%) - can accommodate larger orders"]
-            return assessments[utilization_seed % len(assessments)]
-        elif utilization < 70:
-            assessments = [f"Moderate utilization ({round(utilization)}%) - good balance of space efficiency", 
-                          f"Optimal utilization ({round(utilization)}%) - efficient use of warehouse space",
-                          f"Adequate capacity ({round(utilization)}%) - can handle normal order volumes"]
-            return assessments[utilization_seed % len(assessments)]
-        elif utilization < 90:
-            assessments = [f"High utilization ({round(utilization)}%) - approaching capacity limits", 
-                          f"Near capacity ({round(utilization)}%) - may need to optimize storage",
-                          f"Efficient but limited ({round(utilization)}%) - carefully monitor inventory growth"]
-            return assessments[utilization_seed % len(assessments)]
-        else:
-            assessments = [f"Critical capacity ({round(utilization)}%) - limited space for new inventory", 
-                          f"Over-utilized ({round(utilization)}%) - need immediate storage solutions",
-                          f"At maximum capacity ({round(utilization)}%) - requires expansion or offsite storage"]
-            return assessments[utilization_seed % len(assessments)]
+        performance_seed = _supply_chain_seeds(int(product_id))[3]  # 0-2 to add variability
+        return _SUPPLIER_RATINGS[bisect.bisect_left(_LEAD_TIME_BOUNDS, lead_time)][performance_seed]
+    
+    def _assess_warehouse_capacity(self, current_stock, optimal_order_quantity, product_id, warehouse_capacity=None):
+        """Assess warehouse capacity utilization from current stock and the warehouse's capacity."""
+        utilization_seed = _supply_chain_seeds(int(product_id))[4]  # 0-2 to add variability
+        if not warehouse_capacity or warehouse_capacity <= 0:
+            # No recorded capacity, use a realistic synthetic one
+            warehouse_capacity = 200 + (int(product_id) % 500)
+        utilization = (current_stock / warehouse_capacity) * 100
+        
+        assessment = _WAREHOUSE_ASSESSMENTS[bisect.bisect_right(_UTILIZATION_BOUNDS, utilization)][utilization_seed]
+        return assessment.format(utilization)
     
     def _generate_supply_chain_actions(self, current_stock, reorder_point, lead_time, optimal_order_quantity):
         """Generate recommended actions for supply chain optimization."""
@@ -818,40 +1458,288 @@ class SupplyChainAgent(Agent):
         if lead_time > 7:
             actions.append("Negotiate with supplier for improved lead times or find secondary suppliers")
         
-        # General optimization actions
+        # General optimization actions; at most two actions precede them, so 3-5 are returned
         actions.append(f"Implement EOQ-based ordering system with {optimal_order_quantity} units per order")
-        actions.append("Establish automated reorder points to minimize manual inventory checks")
-        actions.append("Conduct quarterly supplier performance reviews to maintain service levels")
-        
-        # Return 3-5 relevant actions
-        return actions[:min(5, len(actions))]
+        actions.extend(_GENERAL_SUPPLY_CHAIN_ACTIONS)
+        return actions
 
 
 class CoordinatorAgent(Agent):
     """Coordinator agent that manages communication between other agents."""
     
-    def __init__(self, agents=None):
+    # Instructions shared by every coordination prompt; per-product data is appended after it
+    _PROMPT_PREFIX = """
+I need to coordinate inventory optimization decisions for the product and store identified at the end of this message.
+
+The recommendations from various specialized agents are given there. Based on all this information, please provide a comprehensive inventory optimization plan that includes:
+1. Final demand forecast
+2. Optimal inventory level to maintain
+3. Pricing strategy
+4. Order recommendations
+5. Key actions to take
+6. Projected impact on revenue, costs, and profit
+
+Format your response as a JSON with strict adherence to the following structure:
+{
+  "demand_forecast": "Detailed explanation of demand forecast",
+  "optimal_inventory_level": "Explanation of optimal inventory with specific numbers",
+  "pricing_strategy": "Detailed pricing recommendations with specific numbers",
+  "order_recommendations": "Specific ordering recommendations with quantities and timing",
+  "key_actions": ["Action 1", "Action 2", "Action 3", "Action 4"],
+  "projected_impact": {
+    "revenue": "+X%",
+    "costs": "-Y%",
+    "profit_margin": "+Z%",
+    "stockout_risk": "Description"
+  }
+}
+
+IMPORTANT FORMATTING RULES:
+1. Use ONLY double quotes (") for all keys and string values, never single quotes
+2. Do not include trailing commas in objects or arrays
+3. Ensure all keys and string values are properly quoted
+4. Your response must contain ONLY the JSON object, no text before or after
+5. The JSON must be valid and parseable with json.loads()
+"""
+    # Full prompt, filled with str.format_map; the prefix's literal braces are escaped once here
+    _PROMPT_TMPL = (_PROMPT_PREFIX.replace("{", "{{").replace("}", "}}")
+                    + "\nProduct ID: {product_id}\nStore ID: {store_id}\nRecommendations from the specialized agents:\n{data_json}\n")
+    
+    # Specialized agents consulted for every plan, in the order their results are unpacked
+    _AGENT_TYPES = ('demand_forecast', 'inventory_monitor', 'pricing_optimization', 'supply_chain')
+    
+    def __init__(self, agents=None, plan_cache_size=1024, plan_ttl=3600):
         super().__init__(name="CoordinatorAgent")
         self.agents = agents or {}
+        # Parsed plans keyed by the coordination prompt, i.e. by the product and the specialized
+        # agents' outputs; entries expire so unchanged inputs still get a fresh plan eventually
+        self._plan_cache = LLMCache(plan_cache_size, ttl=plan_ttl)
         
     def add_agent(self, agent_type, agent):
         """Add an agent to the coordination network."""
         self.agents[agent_type] = agent
+    
+    def invalidate_cache(self, product_id, store_id):
+        """Forget cached responses for a product here and in every coordinated agent."""
+        removed = super().invalidate_cache(product_id, store_id)
+        removed += self._plan_cache.invalidate(_cache_tag(product_id, store_id))
+        for agent in self.agents.values():
+            removed += agent.invalidate_cache(product_id, store_id)
+        return removed
+    
+    def use_session(self, session):
+        """Send LLM calls from the coordinator and every coordinated agent through the given session."""
+        super().use_session(session)
+        for agent in self.agents.values():
+            agent.use_session(session)
         
     def process(self, product_id=None, store_id=None):
         """Coordinate the multi-agent system to optimize inventory."""
-        # 1. Get demand forecast
-        demand_forecast = self.agents['demand_forecast'].process(product_id, store_id)
+        # Demand forecast, inventory, pricing and supply chain are independent and I/O-bound,
+        # so run them concurrently; result() re-raises any agent's exception as before
+        rows = self._prefetch_rows(product_id, store_id)
+        # Each agent runs in a copy of this context so its fallbacks are tracked with the caller's
+        futures = [_AGENT_POOL.submit(contextvars.copy_context().run, self.agents[agent_type].process,
+                                      product_id, store_id, **rows.get(agent_type, {}))
+                   for agent_type in self._AGENT_TYPES]
+        prompt, plan_key, plan = self._prepare_plan(product_id, store_id, [future.result() for future in futures])
+        if plan is not None:
+            return plan
+        
+        # Query the LLM; the plan cache replaces the response cache so expired plans are regenerated
+        response = self.query_llm(prompt, cache=False, schema=_COORDINATION_PLAN_SCHEMA)
         
-        # 2. Monitor inventory
-        inventory_status = self.agents['inventory_monitor'].process(product_id, store_id)
+        return self._parse_plan(product_id, store_id, response, plan_key)
+    
+    async def aprocess(self, product_id=None, store_id=None):
+        """Coordinate the multi-agent system, running the specialized agents concurrently."""
+        rows = await self._aprefetch_rows(product_id, store_id)
+        return await self._acoordinate(product_id, store_id, rows)
+    
+    def process_batch(self, pairs):
+        """
+        Coordinate optimization plans for several (product_id, store_id) pairs and
+        return them in the same order. The agents' rows for every pair are fetched
+        with one query, and the pairs' LLM calls are in flight together instead
+        of one after another.
+        """
+        return asyncio.run(self.aprocess_batch(pairs))
+    
+    async def aprocess_batch(self, pairs):
+        """Async variant of process_batch."""
+        pairs = list(pairs)
+        if not pairs:
+            return []
+        prefetched = await asyncio.get_running_loop().run_in_executor(_DB_POOL, self._prefetch_batch, pairs)
+        return await asyncio.gather(*(self._acoordinate(product_id, store_id, rows)
+                                      for (product_id, store_id), rows in zip(pairs, prefetched)))
+    
+    async def _acoordinate(self, product_id, store_id, rows):
+        """Run the specialized agents on prefetched rows and build the coordination plan."""
+        results = await asyncio.gather(
+            *(self.agents[agent_type].aprocess(product_id, store_id, **rows.get(agent_type, {}))
+              for agent_type in self._AGENT_TYPES)
+        )
+        prompt, plan_key, plan = self._prepare_plan(product_id, store_id, results)
+        if plan is not None:
+            return plan
+        
+        response = await self.aquery_llm(prompt, cache=False, schema=_COORDINATION_PLAN_SCHEMA)
+        
+        return self._parse_plan(product_id, store_id, response, plan_key)
+    
+    def _prefetch_rows(self, product_id, store_id):
+        """
+        Fetch the inventory, pricing and supply chain rows for one product and store
+        in a single query. Returns {agent_type: {"row": row}} keyword arguments for
+        the agents' process(); agents without an entry query the database themselves.
+        """
+        if product_id is None or store_id is None:
+            return {}
+        columns, rows = self._read_sql(_COORDINATOR_ROWS_SQL, (product_id, store_id))
+        return self._split_prefetched(columns, rows[0])
+    
+    def _prefetch_batch(self, pairs):
+        """_prefetch_rows for many pairs, in one query per _PORTFOLIO_CHUNK pairs."""
+        prefetched = []
+        for start in range(0, len(pairs), _PORTFOLIO_CHUNK):
+            chunk = pairs[start:start + _PORTFOLIO_CHUNK]
+            sql = _COORDINATOR_BATCH_SQL.format(values=", ".join(["(?, ?, ?)"] * len(chunk)))
+            columns, rows = self._read_sql(sql, [value for n, (product_id, store_id) in enumerate(chunk)
+                                                 for value in (n, product_id, store_id)])
+            for (product_id, store_id), row in zip(chunk, rows):
+                prefetched.append({} if product_id is None or store_id is None
+                                  else self._split_prefetched(columns, row))
+        return prefetched
+    
+    async def _aprefetch_rows(self, product_id, store_id):
+        """Async variant of _prefetch_rows using the shared DB thread pool."""
+        if product_id is None or store_id is None:
+            return {}
+        columns, rows = await self._aread_sql(_COORDINATOR_ROWS_SQL, (product_id, store_id))
+        return self._split_prefetched(columns, rows[0])
+    
+    @staticmethod
+    def _split_prefetched(columns, values):
+        """Build each agent's row from a _COORDINATOR_ROWS_SQL result, matching its own query."""
+        tables = []
+        start = 0
+        for end in [i for i, column in enumerate(columns) if column == "__split__"] + [len(columns)]:
+            segment = values[start:end]
+            # A table without a matching row contributes only NULLs
+            tables.append({} if all(value is None for value in segment) else dict(zip(columns[start:end], segment)))
+            start = end + 1
+        inventory, demand, pricing = tables
+        
+        inventory_row = {}
+        if inventory:
+            inventory_row = dict(inventory)
+            for column in ("Sales Quantity", "Price", "Demand Trend"):
+                inventory_row[column] = demand.get(column)
+        pricing_row = {}
+        if pricing:
+            pricing_row = dict(pricing)
+            for column in ("Stock Levels", "Supplier Lead Time (days)", "Stockout Frequency"):
+                pricing_row[column] = inventory.get(column)
+            pricing_row["Sales Quantity"] = demand.get("Sales Quantity")
         
-        # 3. Optimize pricing
-        pricing_recommendations = self.agents['pricing_optimization'].process(product_id, store_id)
+        return {
+            "inventory_monitor": {"row": inventory_row},
+            "pricing_optimization": {"row": pricing_row},
+            "supply_chain": {"row": inventory}
+        }
+    
+    def process_portfolio(self, pairs):
+        """
+        Rule-based inventory and ordering view for many (product_id, store_id) pairs
+        without LLM calls. Stock data for all pairs is loaded as columns in a few
+        queries, the agents work on whole columns, and per-pair dicts are only
+        built at the end.
+        """
+        pairs = [(int(product_id), int(store_id)) for product_id, store_id in pairs]
+        if not pairs:
+            return []
         
-        # 4. Supply chain recommendations
-        supply_chain_recommendations = self.agents['supply_chain'].process(product_id, store_id)
+        soa = self._load_portfolio(pairs)
+        inventory = self.agents['inventory_monitor'].process_batch(soa)
+        supply_chain = self.agents['supply_chain'].process_batch(
+            soa["product_id"], soa["store_id"], soa["current_stock"], soa["lead_time"], soa["warehouse_capacity"]
+        )
         
+        return [
+            {
+                "product_id": product_id,
+                "store_id": store_id,
+                "data_source": "database" if has_data else "synthetic",
+                "current_stock": current_stock,
+                "reorder_point": reorder_point,
+                "lead_time_days": lead_time,
+                "status": _STATUS_STR[status],
+                "status_code": _STATUS_CODE[status],
+                "optimal_order_quantity": f"{quantity} units",
+                "recommended_order_frequency_days": f"{frequency} days",
+                "supplier_performance": supplier,
+                "warehouse_capacity_status": warehouse
+            }
+            for product_id, store_id, has_data, current_stock, reorder_point, lead_time, status, quantity, frequency, supplier, warehouse in zip(
+                soa["product_id"].tolist(), soa["store_id"].tolist(), soa["has_data"].tolist(),
+                soa["current_stock"].tolist(), soa["reorder_point"].tolist(), soa["lead_time"].tolist(),
+                inventory["status"].tolist(),
+                supply_chain["optimal_order_quantity"].tolist(), supply_chain["recommended_order_frequency_days"].tolist(),
+                supply_chain["supplier_performance"], supply_chain["warehouse_capacity_status"]
+            )
+        ]
+    
+    def _load_portfolio(self, pairs):
+        """
+        Load stock data for every pair into a dict of NumPy columns (structure of
+        arrays). Pairs without inventory data get the agents' synthetic values.
+        """
+        found = {}
+        for start in range(0, len(pairs), _PORTFOLIO_CHUNK):
+            chunk = pairs[start:start + _PORTFOLIO_CHUNK]
+            sql = _PORTFOLIO_SQL.format(values=", ".join(["(?, ?)"] * len(chunk)))
+            _, rows = self._read_sql(sql, [value for pair in chunk for value in pair])
+            for product_id, store_id, rowid, *values in rows:
+                # Keep the first stored row per pair, like the single-product queries do
+                if rowid is not None and rowid < found.get((product_id, store_id), (rowid + 1,))[0]:
+                    found[(product_id, store_id)] = (rowid, values)
+        
+        columns = np.full((len(pairs), 4), np.nan)
+        for i, pair in enumerate(pairs):
+            if pair in found:
+                columns[i] = [np.nan if value is None else value for value in found[pair][1]]
+        
+        pids = np.array([product_id for product_id, _ in pairs], dtype=np.int64)
+        sids = np.array([store_id for _, store_id in pairs], dtype=np.int64)
+        
+        def column(index, synthetic):
+            return np.where(np.isnan(columns[:, index]), synthetic, columns[:, index]).astype(np.int64)
+        
+        return {
+            "product_id": pids,
+            "store_id": sids,
+            "has_data": ~np.isnan(columns[:, 0]),
+            "current_stock": column(0, 50 + pids % 150),
+            "reorder_point": column(1, 25 + pids % 50),
+            "lead_time": column(2, 3 + pids % 7),
+            "warehouse_capacity": column(3, 200 + pids % 500)
+        }
+    
+    def _prepare_plan(self, product_id, store_id, results):
+        """
+        Build the coordination prompt from the specialized agents' results, in
+        _AGENT_TYPES order, and look it up in the plan cache. Returns
+        (prompt, plan_key, copy of the cached plan or None).
+        """
+        prompt = self._build_plan_prompt(product_id, store_id, *results)
+        plan_key = LLMCache.make_key(prompt, self.llm_model)
+        plan = self._plan_cache.get(plan_key)
+        return prompt, plan_key, None if plan is None else copy.deepcopy(plan)
+    
+    def _build_plan_prompt(self, product_id, store_id, demand_forecast, inventory_status,
+                           pricing_recommendations, supply_chain_recommendations):
+        """Build the coordination prompt from the specialized agents' outputs."""
         # Prepare data for LLM
         data = {
             'demand_forecast': demand_forecast,
@@ -860,84 +1748,52 @@ class CoordinatorAgent(Agent):
             'supply_chain_recommendations': supply_chain_recommendations
         }
         
-        data_json = json.dumps(data, indent=2)
+        data_json = fast_dumps(data, indent=True)
         
-        # Create prompt for the LLM
-        prompt = f"""
-        I need to coordinate inventory optimization decisions for product ID {product_id} at store ID {store_id}.
-        
-        Here are the recommendations from various specialized agents:
-        {data_json}
-        
-        Based on all this information, please provide a comprehensive inventory optimization plan that includes:
-        1. Final demand forecast
-        2. Optimal inventory level to maintain
-        3. Pricing strategy
-        4. Order recommendations
-        5. Key actions to take
-        6. Projected impact on revenue, costs, and profit
-        
-        Format your response as a JSON with strict adherence to the following structure:
-        {{
-          "demand_forecast": "Detailed explanation of demand forecast",
-          "optimal_inventory_level": "Explanation of optimal inventory with specific numbers",
-          "pricing_strategy": "Detailed pricing recommendations with specific numbers",
-          "order_recommendations": "Specific ordering recommendations with quantities and timing",
-          "key_actions": ["Action 1", "Action 2", "Action 3", "Action 4"],
-          "projected_impact": {{
-            "revenue": "+X%",
-            "costs": "-Y%",
-            "profit_margin": "+Z%",
-            "stockout_risk": "Description"
-          }}
-        }}
-
-        IMPORTANT FORMATTING RULES:
-        1. Use ONLY double quotes (") for all keys and string values, never single quotes
-        2. Do not include trailing commas in objects or arrays
-        3. Ensure all keys and string values are properly quoted
-        4. Your response must contain ONLY the JSON object, no text before or after
-        5. The JSON must be valid and parseable with json.loads()
+        # Static instructions first so the LLM server can reuse its cached prefix; IDs and data go last
+        return self._PROMPT_TMPL.format_map({
+            "product_id": product_id,
+            "store_id": store_id,
+            "data_json": data_json
+        })
+    
+    def _parse_plan(self, product_id, store_id, response, plan_key=None):
+        """
+        Parse the coordination plan from the LLM response, falling back to a default
+        plan. Parsed plans are stored in the plan cache under plan_key; fallbacks are not.
         """
-        
-        # Query the LLM
-        response = self.query_llm(prompt)
-        
         try:
             # Try to parse as JSON
             coordination_plan = self.extract_json_from_text(response)
             if coordination_plan:
                 self.log_message(f"Generated coordination plan for Product {product_id}, Store {store_id}: {coordination_plan}")
+                if plan_key is not None:
+                    # Keep a private copy so callers can mutate the returned plan
+                    self._plan_cache.set(plan_key, copy.deepcopy(coordination_plan), tag=_cache_tag(product_id, store_id))
                 return coordination_plan
             else:
                 # If JSON extraction failed, return a fallback plan
                 self.log_message(f"Failed to extract JSON from coordination plan response, using fallback")
-                return {
-                    "demand_forecast": f"Based on historical data for Product {product_id} at Store {store_id}, we forecast a demand of 120-150 units over the next 30 days.",
-                    "optimal_inventory_level": f"The optimal inventory level for Product {product_id} at Store {store_id} is 180 units.",
-                    "pricing_strategy": {"error": "No data found for the specified product and store"},
-                    "order_recommendations": {"error": "No data found for the specified product and store"},
-                    "key_actions": ["Monitor daily sales closely", "Adjust reorder point", "Consider promotional bundling", "Review supplier performance"],
-                    "projected_impact": {
-                        "revenue": "+8%",
-                        "costs": "-3%",
-                        "profit_margin": "+12%",
-                        "stockout_risk": "Reduced by 35%"
-                    }
-                }
+                _mark_fallback("unparseable coordination plan")
+                return self._fallback_plan(product_id, store_id)
         except Exception as e:
             # If any exception occurs, return a fallback plan
             self.log_message(f"Error in coordination plan: {str(e)}")
-            return {
-                "demand_forecast": f"Based on historical data for Product {product_id} at Store {store_id}, we forecast a demand of 120-150 units over the next 30 days.",
-                "optimal_inventory_level": f"The optimal inventory level for Product {product_id} at Store {store_id} is 180 units.",
-                "pricing_strategy": {"error": "No data found for the specified product and store"},
-                "order_recommendations": {"error": "No data found for the specified product and store"},
-                "key_actions": ["Monitor daily sales closely", "Adjust reorder point", "Consider promotional bundling", "Review supplier performance"],
-                "projected_impact": {
-                    "revenue": "+8%",
-                    "costs": "-3%",
-                    "profit_margin": "+12%",
-                    "stockout_risk": "Reduced by 35%"
-                }
+            _mark_fallback(str(e))
+            return self._fallback_plan(product_id, store_id)
+    
+    def _fallback_plan(self, product_id, store_id):
+        """Default coordination plan used when the LLM response cannot be parsed."""
+        return {
+            "demand_forecast": f"Based on historical data for Product {product_id} at Store {store_id}, we forecast a demand of 120-150 units over the next 30 days.",
+            "optimal_inventory_level": f"The optimal inventory level for Product {product_id} at Store {store_id} is 180 units.",
+            "pricing_strategy": {"error": "No data found for the specified product and store"},
+            "order_recommendations": {"error": "No data found for the specified product and store"},
+            "key_actions": ["Monitor daily sales closely", "Adjust reorder point", "Consider promotional bundling", "Review supplier performance"],
+            "projected_impact": {
+                "revenue": "+8%",
+                "costs": "-3%",
+                "profit_margin": "+12%",
+                "stockout_risk": "Reduced by 35%"
             }
+        }
@@ -1,26 +1,187 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, g, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+import asyncio
+import copy
+import functools
 import os
+import queue
 import sqlite3
-import pandas as pd
+import threading
 import json
+import logging
+from datetime import date, timedelta
+import numpy as np
+
+try:
+    # orjson is optional; when installed it serializes API responses several times faster
+    import orjson
+except ImportError:
+    orjson = None
 from agent_framework import (
     DemandForecastAgent,
     InventoryMonitorAgent,
     PricingOptimizationAgent,
     SupplyChainAgent,
-    CoordinatorAgent
+    CoordinatorAgent,
+    LLMCache,
+    create_llm_session,
+    track_fallbacks
 )
+from create_database import DB_PATH, ensure_database
 # Import the improved JSON formatter
 from json_formatter import process_llm_response, fix_json_response
 
+logger = logging.getLogger(__name__)
+
 # Set environment variables for LLM service with the specific URL and model
 os.environ['LLM_URL'] = 'http://35.154.211.247:11434'
 os.environ['LLM_MODEL'] = 'qwen2.5:0.5b'
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes and decodes with orjson."""
+    
+    def _options(self, indent=False):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options(kwargs.get("indent"))).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Build the body as bytes directly instead of going through an intermediate str
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+# Idle SQLite connections kept open between requests
+_DB_POOL_SIZE = 8
+_db_pool = queue.LifoQueue(maxsize=_DB_POOL_SIZE)
+
+def _open_db():
+    """Open a SQLite connection tuned for the API's concurrent reads."""
+    # The handlers' SQL is module-level constants, so each pooled connection prepares it only once
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=128)
+    # WAL lets concurrent readers proceed; the page cache stays warm while the connection is pooled
+    for pragma in ('journal_mode=WAL', 'synchronous=NORMAL', 'cache_size=-20000',
+                   'temp_store=MEMORY', 'mmap_size=268435456'):
+        conn.execute(f'PRAGMA {pragma}')
+    return conn
+
+def get_conn():
+    """Borrow a pooled SQLite connection for the current request; it is returned on teardown."""
+    if 'db' not in g:
+        try:
+            g.db = _db_pool.get_nowait()
+        except queue.Empty:
+            g.db = _open_db()
+    return g.db
+
+def rows_as_dicts(conn, sql, params=()):
+    """Run a query and return its rows as a list of column -> value dicts."""
+    cursor = conn.execute(sql, params)
+    try:
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+# Largest row count the list endpoints return for a client-supplied limit
+_MAX_ROW_LIMIT = 10000
+
+def clamp_limit(limit):
+    """Bound a client-supplied row limit; negative values, which SQLite treats as no limit, get the maximum."""
+    if limit < 0 or limit > _MAX_ROW_LIMIT:
+        return _MAX_ROW_LIMIT
+    return limit
+
+# Longest forecast horizon a client may request
+_MAX_FORECAST_DAYS = 365
+
+def parse_days_ahead(value):
+    """Return a client-supplied forecast horizon as an int, or None if it is not a whole number in range."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        if not value.is_integer():
+            return None
+        value = int(value)
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return None
+    if days < 0 or days > _MAX_FORECAST_DAYS:
+        return None
+    return days
+
+def stream_rows(conn, sql, params=()):
+    """
+    Run a query and stream its rows inside the usual {"data": [...], "status": "success"}
+    body, encoding them a batch at a time instead of building the whole response in memory.
+    """
+    cursor = conn.execute(sql, params)
+    columns = [column[0] for column in cursor.description]
+    dumps = app.json.dumps
+    
+    def generate():
+        try:
+            yield '{"data": ['
+            separator = ''
+            while True:
+                rows = cursor.fetchmany(256)
+                if not rows:
+                    break
+                yield separator + ', '.join(dumps(dict(zip(columns, row))) for row in rows)
+                separator = ', '
+            yield '], "status": "success"}\n'
+        finally:
+            cursor.close()
+    
+    # The request context, and with it the pooled connection, stays open until the body is sent
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+def _pair_exists_sql(*tables):
+    """Build a query for whether any of the tables has a row for :pid and :sid, one index seek per table."""
+    return 'SELECT ' + ' OR '.join(
+        f'EXISTS (SELECT 1 FROM {table} WHERE "Product ID" = :pid AND "Store ID" = :sid)' for table in tables
+    )
+
+# Existence checks over the tables each endpoint's agent query reads; optimize runs every agent
+_PAIR_IN_SALES_SQL = _pair_exists_sql('demand_forecasting')
+_PAIR_IN_INVENTORY_SQL = _pair_exists_sql('inventory_monitoring')
+_PAIR_IN_INVENTORY_OR_SALES_SQL = _pair_exists_sql('inventory_monitoring', 'demand_forecasting')
+_PAIR_IN_ANY_SQL = _pair_exists_sql('demand_forecasting', 'inventory_monitoring', 'pricing_optimization')
+
+def pair_exists(product_id, store_id, sql=_PAIR_IN_ANY_SQL):
+    """Return True when the database holds data for the product at the store in the tables sql checks."""
+    return bool(get_conn().execute(sql, {"pid": product_id, "sid": store_id}).fetchone()[0])
+
+@app.teardown_appcontext
+def release_conn(exc):
+    """Return the request's connection to the pool, closing it when the pool is full."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        try:
+            _db_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+# Keep-alive connections to the LLM service shared by every agent; sized for concurrent requests
+_LLM_SESSION = create_llm_session(pool_connections=16, pool_maxsize=64)
 
 # Initialize the agent system
-def setup_multi_agent_system():
+def setup_multi_agent_system(session=_LLM_SESSION):
     """Initialize and setup the multi-agent system."""
     # Create individual agents
     demand_forecast_agent = DemandForecastAgent()
@@ -37,16 +198,51 @@ def setup_multi_agent_system():
     coordinator.add_agent('pricing_optimization', pricing_optimization_agent)
     coordinator.add_agent('supply_chain', supply_chain_agent)
     
+    # Route every agent's LLM calls through the server's pooled session
+    coordinator.use_session(session)
+    
     return coordinator
 
 # Create database if it doesn't exist
-if not os.path.exists('database/retail_inventory.db'):
-    # Run the create_database.py script directly
-    os.system('python create_database.py')
+ensure_database()
 
 # Create the coordinator agent
 coordinator = setup_multi_agent_system()
 
+# Agent results for repeated requests, keyed by endpoint and inputs, kept for a few minutes
+_RESULT_TTL = 300
+_result_cache = LLMCache(maxsize=1024, ttl=_RESULT_TTL)
+# One lock per key being computed, so concurrent identical requests share a single LLM run
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def cached_result(key, compute):
+    """
+    Return the cached result for key, calling compute() on a miss. Concurrent misses
+    for the same key wait for the first computation instead of repeating it.
+    Callers get their own copy and may modify it. Results an agent built as a
+    fallback, e.g. after a failed or unparseable LLM response, are not cached, so
+    they stop being served as soon as the LLM recovers.
+    """
+    result = _result_cache.get(key)
+    if result is None:
+        with _inflight_lock:
+            lock = _inflight.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                result = _result_cache.get(key)
+                if result is None:
+                    with track_fallbacks() as fallbacks:
+                        result = compute()
+                    if not fallbacks:
+                        _result_cache.set(key, copy.deepcopy(result))
+                    return result
+        finally:
+            with _inflight_lock:
+                if _inflight.get(key) is lock:
+                    del _inflight[key]
+    return copy.deepcopy(result)
+
 @app.route('/')
 def index():
     """Render the main web UI."""
@@ -57,78 +253,75 @@ def health_check():
     """API health check endpoint."""
     return jsonify({"status": "ok", "message": "Retail Inventory Optimization API is running"})
 
+_PRODUCTS_SQL = """
+SELECT DISTINCT
+    df."Product ID",
+    df."Store ID"
+FROM 
+    demand_forecasting df
+LIMIT 100
+"""
+
 @app.route('/api/products', methods=['GET'])
 def get_products():
     """Get all products."""
     try:
-        conn = sqlite3.connect('database/retail_inventory.db')
-        query = """
-        SELECT DISTINCT
-            df."Product ID",
-            df."Store ID"
-        FROM 
-            demand_forecasting df
-        LIMIT 100
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return jsonify({"status": "success", "data": df.to_dict('records')})
+        conn = get_conn()
+        return jsonify({"status": "success", "data": rows_as_dicts(conn, _PRODUCTS_SQL)})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+_TOP_PRODUCTS_SQL = """
+SELECT 
+    df."Product ID",
+    df."Store ID",
+    SUM(df."Sales Quantity") as total_sales
+FROM 
+    demand_forecasting df
+GROUP BY 
+    df."Product ID", df."Store ID"
+ORDER BY 
+    total_sales DESC
+LIMIT ?
+"""
+
 @app.route('/api/top-products', methods=['GET'])
 def get_top_products():
     """Get top products by sales volume."""
     try:
-        limit = request.args.get('limit', default=10, type=int)
-        
-        conn = sqlite3.connect('database/retail_inventory.db')
-        query = """
-        SELECT 
-            df."Product ID",
-            df."Store ID",
-            SUM(df."Sales Quantity") as total_sales
-        FROM 
-            demand_forecasting df
-        GROUP BY 
-            df."Product ID", df."Store ID"
-        ORDER BY 
-            total_sales DESC
-        LIMIT ?
-        """
-        df = pd.read_sql_query(query, conn, params=(limit,))
-        conn.close()
-        return jsonify({"status": "success", "data": df.to_dict('records')})
+        limit = clamp_limit(request.args.get('limit', default=10, type=int))
+        
+        conn = get_conn()
+        return stream_rows(conn, _TOP_PRODUCTS_SQL, (limit,))
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+_CRITICAL_INVENTORY_SQL = """
+SELECT 
+    im."Product ID",
+    im."Store ID",
+    im."Stock Levels",
+    im."Reorder Point",
+    df."Sales Quantity"
+FROM 
+    inventory_monitoring im
+LEFT JOIN 
+    demand_forecasting df ON im."Product ID" = df."Product ID" AND im."Store ID" = df."Store ID"
+WHERE 
+    im."Stock Levels" < im."Reorder Point"
+ORDER BY 
+    (im."Reorder Point" - im."Stock Levels") DESC
+LIMIT ?
+"""
+
 @app.route('/api/critical-inventory', methods=['GET'])
 def get_critical_inventory():
     """Get products with critical inventory levels."""
     try:
-        limit = request.args.get('limit', default=10, type=int)
-        
-        conn = sqlite3.connect('database/retail_inventory.db')
-        query = """
-        SELECT 
-            im."Product ID",
-            im."Store ID",
-            im."Stock Levels",
-            im."Reorder Point",
-            df."Sales Quantity"
-        FROM 
-            inventory_monitoring im
-        LEFT JOIN 
-            demand_forecasting df ON im."Product ID" = df."Product ID" AND im."Store ID" = df."Store ID"
-        WHERE 
-            im."Stock Levels" < im."Reorder Point"
-        ORDER BY 
-            (im."Reorder Point" - im."Stock Levels") DESC
-        LIMIT ?
-        """
-        df = pd.read_sql_query(query, conn, params=(limit,))
-        conn.close()
-        return jsonify({"status": "success", "data": df.to_dict('records')})
+        limit = clamp_limit(request.args.get('limit', default=10, type=int))
+        
+        conn = get_conn()
+        return stream_rows(conn, _CRITICAL_INVENTORY_SQL, (limit,))
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -143,12 +336,27 @@ def optimize_inventory():
         if not product_id or not store_id:
             return jsonify({"status": "error", "message": "Product ID and Store ID are required"}), 400
         
-        print(f"Starting optimization for Product {product_id}, Store {store_id}")
+        # Convert the IDs once here; everything downstream works with ints
+        try:
+            product_id, store_id = int(product_id), int(store_id)
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "Product ID and Store ID must be integers"}), 400
         
-        # Run the multi-agent optimization
-        raw_optimization_plan = coordinator.process(product_id, store_id)
+        # Unknown IDs would only produce generic fallback data, so skip the LLM round trip
+        if not pair_exists(product_id, store_id, _PAIR_IN_ANY_SQL):
+            return jsonify({"status": "error", "message": "No data found for the specified product and store"}), 404
         
-        print(f"Raw optimization plan: {raw_optimization_plan}")
+        logger.info("Starting optimization for Product %s, Store %s", product_id, store_id)
+        
+        # Run the multi-agent optimization on the coordinator's async path. Each request gets its
+        # own event loop, so concurrent requests wait on the LLM side by side instead of queueing
+        # for the threads of the shared agent pool
+        raw_optimization_plan = cached_result(
+            ('optimize', str(product_id), str(store_id)),
+            lambda: asyncio.run(coordinator.aprocess(product_id, store_id))
+        )
+        
+        logger.debug("Raw optimization plan: %s", raw_optimization_plan)
         
         # Use the improved JSON formatter to process the response
         if isinstance(raw_optimization_plan, str):
@@ -175,103 +383,99 @@ def optimize_inventory():
             }
         })
     except Exception as e:
-        import traceback
-        print(f"Error in optimize_inventory: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in optimize_inventory: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# Standard plan fields and the LLM field names they may arrive under, in order of preference
+_FIELD_MAPPING = {
+    'demand_forecast': ('demand_forecast',),
+    'optimal_inventory_level': ('optimal_inventory_level', 'inventory_status'),
+    'pricing_strategy': ('pricing_strategy', 'pricing_recommendations'),
+    'order_recommendations': ('order_recommendations', 'supply_chain_recommendations'),
+    'key_actions': ('key_actions',),
+    'projected_impact': ('projected_impact',)
+}
+
+def _plan_dict_value(value, standard_field, fallback_plan):
+    """Use the fallback for a dict holding an error and unwrap a json_formatter value field."""
+    if 'error' in value:
+        return fallback_plan[standard_field]
+    return value['value'] if 'value' in value else value
+
+def _plan_list_value(value, standard_field, fallback_plan):
+    """Convert key_actions lists to numbered lines; keep other lists as they are."""
+    if standard_field == 'key_actions':
+        return '\n'.join(f"{i}. {item}" for i, item in enumerate(value, 1))
+    return value
+
+# How each JSON container type is normalized; any other value is used as a string
+_PLAN_VALUE_HANDLERS = {dict: _plan_dict_value, list: _plan_list_value}
+
+def _standardize_plan_field(plan, standard_field, possible_fields, fallback_plan):
+    """Return the normalized value of the first present field name, or the fallback when none is."""
+    value = next((plan[field] for field in possible_fields if plan.get(field) is not None), None)
+    if value is None:
+        return fallback_plan[standard_field]
+    handler = _PLAN_VALUE_HANDLERS.get(type(value))
+    return handler(value, standard_field, fallback_plan) if handler else str(value)
+
 def preprocess_optimization_plan(plan, product_id, store_id):
     """
     Preprocess and standardize the optimization plan from LLM.
     Handles different response formats and ensures consistent structure.
     """
-    print(f"Preprocessing optimization plan: {plan}")
+    logger.debug("Preprocessing optimization plan: %s", plan)
     
     # If plan is None or not a dict, use fallback
     if plan is None or not isinstance(plan, dict):
-        print("Plan is None or not a dict, using fallback")
+        logger.info("Plan is None or not a dict, using fallback")
         return get_fallback_optimization_plan(product_id, store_id)
     
     # Check if we got an explanation but no structured data
     if 'explanation' in plan and not any(key in plan for key in ['demand_forecast', 'optimal_inventory_level', 'pricing_strategy']):
-        print(f"Got unstructured explanation: {plan.get('explanation')}")
+        logger.debug("Got unstructured explanation: %s", plan.get('explanation'))
         error_msg = plan.get('explanation', '')
         if error_msg.startswith("Exception:") or error_msg.startswith("Error:"):
-            print(f"LLM service error: {error_msg}")
+            logger.warning("LLM service error: %s", error_msg)
             return get_fallback_optimization_plan(product_id, store_id)
     
-    # Create a standardized plan structure
-    standardized_plan = {}
-    fallback_plan = get_fallback_optimization_plan(product_id, store_id)
-    
-    # Define standard field names and their fallback equivalents
-    field_mapping = {
-        'demand_forecast': ['demand_forecast'],
-        'optimal_inventory_level': ['optimal_inventory_level', 'inventory_status'],
-        'pricing_strategy': ['pricing_strategy', 'pricing_recommendations'],
-        'order_recommendations': ['order_recommendations', 'supply_chain_recommendations'],
-        'key_actions': ['key_actions'],
-        'projected_impact': ['projected_impact']
+    # Create a standardized plan structure in one pass over the mapping; the shared
+    # fallback is only read, never modified
+    fallback_plan = _fallback_plan_template(product_id, store_id)
+    standardized_plan = {
+        standard_field: _standardize_plan_field(plan, standard_field, possible_fields, fallback_plan)
+        for standard_field, possible_fields in _FIELD_MAPPING.items()
     }
     
-    # Process each field using the mapping
-    for standard_field, possible_fields in field_mapping.items():
-        value = None
-        # Try each possible field name
-        for field in possible_fields:
-            if field in plan and plan[field] is not None:
-                value = plan[field]
-                break
-        
-        # If no matching field was found, use fallback
-        if value is None:
-            standardized_plan[standard_field] = fallback_plan[standard_field]
-            continue
-            
-        # Handle different types consistently
-        if isinstance(value, dict):
-            # If the dict contains an error message, use the fallback
-            if 'error' in value:
-                standardized_plan[standard_field] = fallback_plan[standard_field]
-            # If the dict contains a value field (from json_formatter), use that value
-            elif 'value' in value:
-                standardized_plan[standard_field] = value['value']
-            # Otherwise keep the dict as is
-            else:
-                standardized_plan[standard_field] = value
-        elif isinstance(value, list):
-            # Convert lists to formatted strings if they're for key_actions
-            if standard_field == 'key_actions':
-                standardized_plan[standard_field] = '\n'.join([f"{i+1}. {item}" for i, item in enumerate(value)])
-            else:
-                standardized_plan[standard_field] = value
-        else:
-            # Use as string
-            standardized_plan[standard_field] = str(value)
-    
     # Special handling for projected_impact to ensure it's a dictionary
     if not isinstance(standardized_plan.get('projected_impact'), dict):
         standardized_plan['projected_impact'] = fallback_plan['projected_impact']
     
-    # Ensure all fields in projected_impact are strings
-    if 'projected_impact' in standardized_plan and isinstance(standardized_plan['projected_impact'], dict):
-        for key in standardized_plan['projected_impact']:
-            if standardized_plan['projected_impact'][key] is not None:
-                # Convert numeric values to percentage strings if not already formatted
-                value = standardized_plan['projected_impact'][key]
-                if isinstance(value, (int, float)):
-                    if key in ['revenue', 'costs', 'profit_margin']:
-                        # Format as percentage with sign
-                        standardized_plan['projected_impact'][key] = f"{'+' if value >= 0 else ''}{value}%"
-                    else:
-                        standardized_plan['projected_impact'][key] = str(value)
-                else:
-                    standardized_plan['projected_impact'][key] = str(value)
+    # Ensure all fields in projected_impact are strings, building a new dict so neither the
+    # LLM's plan nor the shared fallback is modified
+    projected_impact = {}
+    for key, value in standardized_plan['projected_impact'].items():
+        if value is not None:
+            # Convert numeric values to percentage strings if not already formatted
+            if isinstance(value, (int, float)) and key in ('revenue', 'costs', 'profit_margin'):
+                # Format as percentage with sign
+                value = f"{'+' if value >= 0 else ''}{value}%"
+            else:
+                value = str(value)
+        projected_impact[key] = value
+    standardized_plan['projected_impact'] = projected_impact
     
     return standardized_plan
 
 def get_fallback_optimization_plan(product_id, store_id):
     """Get fallback optimization plan when LLM fails."""
+    plan = dict(_fallback_plan_template(product_id, store_id))
+    plan['projected_impact'] = dict(plan['projected_impact'])
+    return plan
+
+@functools.lru_cache(maxsize=4096)
+def _fallback_plan_template(product_id, store_id):
+    """Fallback optimization plan for a product and store, built once and shared; do not modify."""
     return {
         'demand_forecast': f"Forecasted demand for product ID {product_id} at store ID {store_id} over the next 30 days is based on historical sales data and a seasonal adjustment model, considering factors such as seasonality (like holidays), trends in previous months' sales, and any external economic or market conditions. The predicted quantity accounts for variability and may vary slightly due to changes in demand patterns.",
         'optimal_inventory_level': f"The optimal inventory level for Product {product_id} at Store {store_id} is 180 units. This accounts for the forecasted demand, a safety stock buffer of 20%, and considers the supplier lead time of 7 days.",
@@ -286,38 +490,8 @@ def get_fallback_optimization_plan(product_id, store_id):
         }
     }
 
-def get_fallback_pricing(product_id, store_id):
-    """Get fallback pricing recommendations when LLM fails."""
-    # Calculate a base price that seems realistic but varies by product and store
-    base_price = float(product_id) % 100 + 15.99
-    discount = 5 + (float(store_id) % 10)
-    
-    return {
-        "optimal_price": f"${base_price:.2f}",
-        "recommended_discount_percentage": f"{discount}% during weekends and holidays",
-        "elasticity_assessment": f"Product {product_id} has moderate price elasticity. A 10% price reduction is estimated to increase sales volume by 15-20%.",
-        "expected_sales_impact": f"Implementing the recommended pricing strategy is expected to increase sales volume by 12-15% over the next 30 days.",
-        "expected_profit_impact": f"Despite the discount, the increased sales volume should result in a net profit increase of approximately 8-10%."
-    }
-
-def get_fallback_supply_chain(product_id, store_id):
-    """Get fallback supply chain recommendations when LLM fails."""
-    # Create varying but realistic values based on product and store IDs
-    order_qty = 50 + (int(product_id) % 100)
-    freq = 7 + (int(store_id) % 14)
-    
-    return {
-        "optimal_order_quantity": f"{order_qty} units",
-        "recommended_order_frequency_days": f"{freq}",
-        "supplier_performance": f"Current supplier for Product {product_id} has a 92% on-time delivery rate with average lead time of 5 days. Performance is adequate but there's room for improvement.",
-        "warehouse_capacity_status": f"Store {store_id} warehouse is currently at 68% capacity. Sufficient space available for the recommended order quantity.",
-        "recommended_actions": [
-            f"Consolidate orders with other products from the same supplier to reduce shipping costs",
-            f"Set up automated reordering when inventory reaches 25% of optimal level",
-            f"Negotiate shorter lead times with supplier",
-            f"Consider secondary supplier options for peak season demand"
-        ]
-    }
+# First day of the demo forecast returned when the forecast agent has nothing usable
+_FORECAST_START_DATE = date(2025, 2, 1)
 
 @app.route('/api/forecast', methods=['POST'])
 def forecast_demand():
@@ -331,38 +505,55 @@ def forecast_demand():
         if not product_id or not store_id:
             return jsonify({"status": "error", "message": "Product ID and Store ID are required"}), 400
         
-        print(f"Starting forecast for Product {product_id}, Store {store_id}, Days ahead {days_ahead}")
+        # Convert the IDs once here; everything downstream works with ints
+        try:
+            product_id, store_id = int(product_id), int(store_id)
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "Product ID and Store ID must be integers"}), 400
+        
+        days_ahead = parse_days_ahead(days_ahead)
+        if days_ahead is None:
+            return jsonify({"status": "error", "message": f"Days ahead must be an integer between 0 and {_MAX_FORECAST_DAYS}"}), 400
+        
+        # Unknown IDs would only produce generic fallback data, so skip the LLM round trip
+        if not pair_exists(product_id, store_id, _PAIR_IN_SALES_SQL):
+            return jsonify({"status": "error", "message": "No data found for the specified product and store"}), 404
+        
+        logger.info("Starting forecast for Product %s, Store %s, Days ahead %s", product_id, store_id, days_ahead)
         
         # Run the demand forecast agent
-        demand_forecast = coordinator.agents['demand_forecast'].process(product_id, store_id, days_ahead)
+        demand_forecast = cached_result(
+            ('forecast', str(product_id), str(store_id), str(days_ahead)),
+            lambda: coordinator.agents['demand_forecast'].process(product_id, store_id, days_ahead)
+        )
         
         # Log what we received from the agent
-        print(f"Raw forecast data from agent: {demand_forecast}")
+        logger.debug("Raw forecast data from agent: %s", demand_forecast)
         
         # Create a simple fallback if the response is empty or malformed
         if not demand_forecast or (isinstance(demand_forecast, dict) and 'error' in demand_forecast):
             # Generate fallback forecast data for demonstration
-            days = int(days_ahead)
-            base_demand = 100 + int(product_id) % 100
+            days = days_ahead
+            base_demand = 100 + product_id % 100
             
-            print(f"Using fallback forecast data for Product {product_id}, Store {store_id}")
+            logger.info("Using fallback forecast data for Product %s, Store %s", product_id, store_id)
             
             # Create daily forecast with some randomness
-            daily_forecast = []
             summary = f"Forecasted demand for Product {product_id} at Store {store_id} over the next {days} days shows a steady pattern with an average of {base_demand} units per day."
             
-            import random
-            for i in range(days):
-                # Add some randomness and a slight upward trend
-                variation = random.uniform(-0.15, 0.25)
-                trend_factor = 1 + (i / days * 0.1)  # Slight upward trend
-                
-                quantity = int(base_demand * (1 + variation) * trend_factor)
-                daily_forecast.append({
+            # Add some randomness and a slight upward trend, for all days at once
+            day_index = np.arange(days)
+            variation = np.random.default_rng().uniform(-0.15, 0.25, days)
+            trend_factor = 1 + day_index / days * 0.1
+            quantities = (base_demand * (1 + variation) * trend_factor).astype(int)
+            daily_forecast = [
+                {
                     "day": i + 1,
-                    "date": f"2025-02-{(i+1):02d}",
+                    "date": (_FORECAST_START_DATE + timedelta(days=i)).isoformat(),
                     "quantity": quantity
-                })
+                }
+                for i, quantity in enumerate(quantities.tolist())
+            ]
             
             demand_forecast = {
                 "summary": summary,
@@ -382,17 +573,17 @@ def forecast_demand():
                     # If no JSON could be extracted, use the text as explanation
                     demand_forecast = {
                         "explanation": demand_forecast,
-                        "forecast_quantity": str(100 + int(product_id) % 900)  # Generate a plausible forecast number
+                        "forecast_quantity": str(100 + product_id % 900)  # Generate a plausible forecast number
                     }
             except Exception as e:
-                print(f"Error processing forecast string response: {e}")
+                logger.warning("Error processing forecast string response: %s", e)
                 # Keep the string as is
                 demand_forecast = {"explanation": demand_forecast}
         
         # For standard data check, ensure we preserve the existing structure from the LLM
         # which may include forecast_quantity and explanation fields
         
-        print(f"Final forecast data to return: {demand_forecast}")
+        logger.debug("Final forecast data to return: %s", demand_forecast)
         
         return jsonify({
             "status": "success", 
@@ -404,9 +595,7 @@ def forecast_demand():
             }
         })
     except Exception as e:
-        import traceback
-        print(f"Error in forecast_demand: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in forecast_demand: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/inventory-status', methods=['POST'])
@@ -420,8 +609,21 @@ def inventory_status():
         if not product_id or not store_id:
             return jsonify({"status": "error", "message": "Product ID and Store ID are required"}), 400
         
+        # Convert the IDs once here; everything downstream works with ints
+        try:
+            product_id, store_id = int(product_id), int(store_id)
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "Product ID and Store ID must be integers"}), 400
+        
+        # Unknown IDs would only produce generic fallback data, so skip the LLM round trip
+        if not pair_exists(product_id, store_id, _PAIR_IN_INVENTORY_OR_SALES_SQL):
+            return jsonify({"status": "error", "message": "No data found for the specified product and store"}), 404
+        
         # Run the inventory monitor agent
-        inventory_status = coordinator.agents['inventory_monitor'].process(product_id, store_id)
+        inventory_status = cached_result(
+            ('inventory-status', str(product_id), str(store_id)),
+            lambda: coordinator.agents['inventory_monitor'].process(product_id, store_id)
+        )
         
         # The agent implementation now handles fallbacks internally
         # so we can directly use the result
@@ -435,9 +637,7 @@ def inventory_status():
             }
         })
     except Exception as e:
-        import traceback
-        print(f"Error in inventory_status: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in inventory_status: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/pricing', methods=['POST'])
@@ -451,8 +651,21 @@ def optimize_pricing():
         if not product_id or not store_id:
             return jsonify({"status": "error", "message": "Product ID and Store ID are required"}), 400
         
+        # Convert the IDs once here; everything downstream works with ints
+        try:
+            product_id, store_id = int(product_id), int(store_id)
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "Product ID and Store ID must be integers"}), 400
+        
+        # Unknown IDs would only produce generic fallback data, so skip the LLM round trip
+        if not pair_exists(product_id, store_id, _PAIR_IN_ANY_SQL):
+            return jsonify({"status": "error", "message": "No data found for the specified product and store"}), 404
+        
         # Run the pricing optimization agent
-        pricing_recommendations = coordinator.agents['pricing_optimization'].process(product_id, store_id)
+        pricing_recommendations = cached_result(
+            ('pricing', str(product_id), str(store_id)),
+            lambda: coordinator.agents['pricing_optimization'].process(product_id, store_id)
+        )
         
         # The agent implementation now handles fallbacks internally
         # so we can directly use the result
@@ -466,9 +679,7 @@ def optimize_pricing():
             }
         })
     except Exception as e:
-        import traceback
-        print(f"Error in optimize_pricing: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in optimize_pricing: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/supply-chain', methods=['POST'])
@@ -482,8 +693,21 @@ def supply_chain_recommendations():
         if not product_id or not store_id:
             return jsonify({"status": "error", "message": "Product ID and Store ID are required"}), 400
         
+        # Convert the IDs once here; everything downstream works with ints
+        try:
+            product_id, store_id = int(product_id), int(store_id)
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "Product ID and Store ID must be integers"}), 400
+        
+        # Unknown IDs would only produce generic fallback data, so skip the LLM round trip
+        if not pair_exists(product_id, store_id, _PAIR_IN_INVENTORY_SQL):
+            return jsonify({"status": "error", "message": "No data found for the specified product and store"}), 404
+        
         # Run the supply chain agent
-        supply_chain = coordinator.agents['supply_chain'].process(product_id, store_id)
+        supply_chain = cached_result(
+            ('supply-chain', str(product_id), str(store_id)),
+            lambda: coordinator.agents['supply_chain'].process(product_id, store_id)
+        )
         
         # The agent implementation now handles fallbacks internally
         # so we can directly use the result
@@ -497,44 +721,28 @@ def supply_chain_recommendations():
             }
         })
     except Exception as e:
-        import traceback
-        print(f"Error in supply_chain_recommendations: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in supply_chain_recommendations: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
+_DASHBOARD_STATS_SQL = """
+SELECT
+    (SELECT COUNT(DISTINCT "Product ID") FROM demand_forecasting),
+    (SELECT COUNT(DISTINCT "Store ID") FROM demand_forecasting),
+    (SELECT COUNT(*) FROM inventory_monitoring WHERE "Stock Levels" < "Reorder Point")
+"""
+
 @app.route('/api/dashboard-stats', methods=['GET'])
 def get_dashboard_stats():
     """Get statistics for the dashboard."""
     try:
-        conn = sqlite3.connect('database/retail_inventory.db')
-        
-        # Get total unique products
-        products_query = "SELECT COUNT(DISTINCT \"Product ID\") FROM demand_forecasting"
-        products_df = pd.read_sql_query(products_query, conn)
-        total_products = products_df.iloc[0, 0]
-        
-        # Get total unique stores
-        stores_query = "SELECT COUNT(DISTINCT \"Store ID\") FROM demand_forecasting"
-        stores_df = pd.read_sql_query(stores_query, conn)
-        total_stores = stores_df.iloc[0, 0]
-        
-        # Get critical items count
-        critical_query = """
-        SELECT 
-            COUNT(*) 
-        FROM 
-            inventory_monitoring 
-        WHERE 
-            "Stock Levels" < "Reorder Point"
-        """
-        critical_df = pd.read_sql_query(critical_query, conn)
-        critical_items = critical_df.iloc[0, 0]
+        conn = get_conn()
+        
+        # Total unique products, total unique stores and critical items in one round trip
+        total_products, total_stores, critical_items = conn.execute(_DASHBOARD_STATS_SQL).fetchone()
         
         # Mock optimization accuracy (could be calculated from historical data in a real system)
         optimization_accuracy = 94
         
-        conn.close()
-        
         return jsonify({
             "status": "success",
             "data": {
@@ -556,8 +764,20 @@ def get_dashboard_stats():
         })
 
 if __name__ == '__main__':
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'WARNING').upper(),
+                        format="%(levelname)s %(name)s: %(message)s")
     # Create templates directory if it doesn't exist
     os.makedirs('templates', exist_ok=True)
     print("Starting RetailPlus API Server...")
     print("Access the application at http://localhost:5000")
-    app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
+    # The reloader and interactive debugger are for development only and must be asked for
+    if os.environ.get('RETAILPLUS_DEBUG') == '1':
+        app.run(host='0.0.0.0', port=5000, debug=True)
+    else:
+        try:
+            # waitress is optional; it serves requests from a thread pool instead of the dev server
+            from waitress import serve
+        except ImportError:
+            app.run(host='0.0.0.0', port=5000, threaded=True)
+        else:
+            serve(app, host='0.0.0.0', port=5000, threads=16) 
\ No newline at end of file
@@ -1,23 +1,149 @@
+import csv
 import sqlite3
-import pandas as pd
 import os
 
+DB_PATH = 'database/retail_inventory.db'
+DATASET_DIR = 'Dataset/[use case 1] Inventory Optimization for Retail'
+
+# Cell values loaded as NULL, the same defaults pandas.read_csv treats as missing
+_NA_VALUES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+})
+_BOOL_VALUES = {'True': 1, 'TRUE': 1, 'true': 1, 'False': 0, 'FALSE': 0, 'false': 0}
+
+# Indexes for the (Product ID, Store ID) lookups and joins used by the API, agents and main.py.
+# The demand index also covers "Sales Quantity" so the top-products aggregate never touches the
+# table. The partial critical-inventory index holds only the rows those queries look for, ordered
+# by how far stock is below the reorder point, so their ORDER BY ... LIMIT needs no sort.
+_INDEXES = {
+    'idx_df_pid_sid_sales': 'demand_forecasting("Product ID", "Store ID", "Sales Quantity")',
+    'idx_im_pid_sid': 'inventory_monitoring("Product ID", "Store ID")',
+    'idx_po_pid_sid': 'pricing_optimization("Product ID", "Store ID")',
+    'idx_im_critical_gap': 'inventory_monitoring(("Reorder Point" - "Stock Levels"), "Product ID", "Store ID", '
+                           '"Stock Levels", "Reorder Point") WHERE "Stock Levels" < "Reorder Point"'
+}
+# Indexes from earlier versions that an index above replaces
+_OBSOLETE_INDEXES = ('idx_im_critical',)
+
+def _value_kind(value):
+    """Classify a non-missing CSV cell as 'bool', 'int', 'float' or 'text'."""
+    if value in _BOOL_VALUES:
+        return 'bool'
+    try:
+        int(value)
+        return 'int'
+    except ValueError:
+        pass
+    try:
+        float(value)
+        return 'float'
+    except ValueError:
+        return 'text'
+
+def _column_types(path):
+    """
+    Infer each CSV column's SQLite type as pandas.read_csv followed by to_sql would:
+    whole numbers and booleans are INTEGER, other numbers (and whole numbers with
+    missing values) REAL, anything else TEXT. Returns (header, types).
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        kinds = [set() for _ in header]
+        for row in reader:
+            for column_kinds, value in zip(kinds, row):
+                column_kinds.add('missing' if value in _NA_VALUES else _value_kind(value))
+    
+    types = []
+    for column_kinds in kinds:
+        present = column_kinds - {'missing'}
+        if 'text' in present or ('bool' in present and len(present) > 1):
+            types.append('TEXT')
+        elif present == {'bool'} or present == {'int'} and 'missing' not in column_kinds:
+            types.append('INTEGER')
+        else:
+            types.append('REAL')
+    return header, types
+
+def _load_csv(conn, table, path):
+    """Replace a table with a CSV file's rows, streamed through a single executemany."""
+    header, types = _column_types(path)
+    converters = []
+    for column_type in types:
+        if column_type == 'TEXT':
+            converters.append(str)
+        elif column_type == 'REAL':
+            converters.append(float)
+        else:
+            converters.append(lambda value: _BOOL_VALUES[value] if value in _BOOL_VALUES else int(value))
+    
+    def rows():
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            next(reader)
+            for row in reader:
+                yield [None if value in _NA_VALUES else convert(value) for convert, value in zip(converters, row)]
+    
+    columns = ',\n'.join(f'"{name}" {column_type}' for name, column_type in zip(header, types))
+    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+    conn.execute(f'CREATE TABLE "{table}" (\n{columns}\n)')
+    conn.executemany(f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(header))})', rows())
+
+def _create_indexes(conn):
+    """Create any missing indexes and drop superseded ones. Returns True when anything changed."""
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    missing = [name for name in _INDEXES if name not in existing]
+    obsolete = [name for name in _OBSOLETE_INDEXES if name in existing]
+    for name in missing:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {_INDEXES[name]}')
+    for name in obsolete:
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    return bool(missing or obsolete)
+
+def ensure_database():
+    """
+    Create the database unless it already exists, and bring an existing database's
+    indexes up to date. Returns True when the database was created.
+    """
+    if not os.path.exists(DB_PATH):
+        create_database()
+        return True
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            changed = _create_indexes(conn)
+        if changed:
+            # Refresh the planner statistics for the new indexes
+            conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    return False
+
 def create_database():
     # Create database directory if it doesn't exist
     os.makedirs('database', exist_ok=True)
     
     # Connect to SQLite database (will be created if it doesn't exist)
-    conn = sqlite3.connect('database/retail_inventory.db')
+    conn = sqlite3.connect(DB_PATH)
     
-    # Load datasets
-    demand_forecasting = pd.read_csv('Dataset/[use case 1] Inventory Optimization for Retail/demand_forecasting.csv')
-    inventory_monitoring = pd.read_csv('Dataset/[use case 1] Inventory Optimization for Retail/inventory_monitoring.csv')
-    pricing_optimization = pd.read_csv('Dataset/[use case 1] Inventory Optimization for Retail/pricing_optimization.csv')
+    # Bulk-load settings: no rollback journal or fsyncs while the tables are rebuilt
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA temp_store=MEMORY')
     
-    # Store datasets in SQLite database
-    demand_forecasting.to_sql('demand_forecasting', conn, if_exists='replace', index=False)
-    inventory_monitoring.to_sql('inventory_monitoring', conn, if_exists='replace', index=False)
-    pricing_optimization.to_sql('pricing_optimization', conn, if_exists='replace', index=False)
+    # Load the datasets into SQLite in one transaction
+    with conn:
+        for table in ('demand_forecasting', 'inventory_monitoring', 'pricing_optimization'):
+            _load_csv(conn, table, os.path.join(DATASET_DIR, f'{table}.csv'))
+    
+    # Restore the default durability settings
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.execute('PRAGMA synchronous=FULL')
+    
+    # Index the lookups, joins and sorts used by the API, agents and main.py
+    with conn:
+        _create_indexes(conn)
     
     # Create views to make it easier to join data
     conn.execute('''
@@ -56,6 +182,9 @@ def create_database():
         ON d."Product ID" = p."Product ID" AND d."Store ID" = p."Store ID"
     ''')
     
+    # Gather statistics so the query planner makes use of the indexes
+    conn.execute('ANALYZE')
+    
     # Close the connection
     conn.close()
     
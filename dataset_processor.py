@@ -1,10 +1,190 @@
 import os
 import json
+import atexit
+import hashlib
+import pickle
+import stat
+import threading
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from json_formatter import fix_json_response
+from json_formatter import parse_llm_json, fast_loads
+
+try:
+    # pyarrow is optional; when installed pandas parses CSV files with its multithreaded reader
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    # python-calamine is optional; its Rust Excel reader is a pandas engine from pandas 2.2
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+_CSV_ENGINE = 'pyarrow' if pyarrow is not None else 'c'
+_EXCEL_ENGINE = 'calamine' if python_calamine is not None and tuple(map(int, pd.__version__.split('.')[:2])) >= (2, 2) else None
+
+# Per-user location for callers that opt in to caching loaded datasets and their summary statistics.
+# Entries are unpickled, which can run code, so they are only read from a directory and files owned
+# by the current user that no one else can write to.
+_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                          'retailplus')
+# Cache files kept; the least recently used beyond this are removed
+_CACHE_MAX_FILES = 32
+
+# Draw long lines in chunks of this many points so Agg renders large time series quickly
+matplotlib.rcParams['agg.path.chunksize'] = 10000
+
+# Date layouts tried against a column's first value so pandas can parse it with a known format
+_DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%m/%d/%Y')
+
+def _detect_date_format(dates):
+    """Return the entry of _DATE_FORMATS matching the first non-missing value, or None."""
+    present = dates.notna().to_numpy()
+    if not present.any():
+        return None
+    sample = dates.iloc[present.argmax()]
+    if not isinstance(sample, str):
+        return None
+    for fmt in _DATE_FORMATS:
+        try:
+            datetime.strptime(sample, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+def _top_totals(keys, values, k=10):
+    """
+    Sum values per key and return the k largest totals as a Series sorted descending,
+    like groupby(keys).sum().sort_values(ascending=False).head(k) but selecting the top
+    k with a partial sort instead of sorting every group. Missing keys are dropped and
+    missing values count as zero.
+    """
+    codes, uniques = pd.factorize(keys)
+    present = codes >= 0
+    weights = values.to_numpy(dtype=np.float64, na_value=0.0)[present]
+    sums = np.bincount(codes[present], weights=weights, minlength=len(uniques))
+    
+    k = min(k, len(sums))
+    top = np.argpartition(-sums, k - 1)[:k] if k else np.empty(0, dtype=np.intp)
+    top = top[np.argsort(-sums[top], kind='stable')]
+    return pd.Series(sums[top], index=pd.Index(uniques.take(top), name=keys.name), name=values.name)
+
+def _histogram(series, bins=20):
+    """
+    Bin a numeric Series' non-missing values like matplotlib's hist would, returning
+    (counts, edges). NumPy columns are binned in place, masking NaNs only for floats.
+    """
+    if isinstance(series.dtype, np.dtype):
+        values = series.to_numpy()
+        if values.dtype.kind == 'f':
+            values = values[~np.isnan(values)]
+    else:
+        values = series.dropna().to_numpy(dtype=np.float64)
+    return np.histogram(values, bins=bins)
+
+# Figure renderers for plot_basic_insights. They are module-level so worker processes can
+# unpickle them, and take plain arrays or Series rather than the processor. Each builds a
+# Figure on its own Agg canvas, bypassing pyplot's global figure manager, so nothing needs
+# closing once the figure is saved.
+
+def _new_axes(figsize):
+    """Create a figure with an Agg canvas and return its single axes."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig.subplots()
+
+def _render_hist(col, counts, edges, filename):
+    """Save a histogram of one numeric column from its precomputed bin counts."""
+    ax = _new_axes((10, 6))
+    # One weighted sample per bin draws the same bars as hist over the raw values
+    ax.hist(edges[:-1], bins=edges, weights=counts, alpha=0.7)
+    ax.set_title(f'Distribution of {col}')
+    ax.set_xlabel(col)
+    ax.set_ylabel('Frequency')
+    ax.grid(True, alpha=0.3)
+    ax.figure.savefig(filename)
+
+def _render_timeseries(time_series, metric, filename):
+    """Save a line plot of a metric's daily totals."""
+    ax = _new_axes((12, 6))
+    ax.plot(time_series.index, time_series.to_numpy(), marker='o', linestyle='-', alpha=0.7)
+    ax.set_title(f'Time Series of {metric.capitalize()} Over Time')
+    ax.set_xlabel('Date')
+    ax.set_ylabel(metric.capitalize())
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.figure.tight_layout()
+    ax.figure.savefig(filename)
+
+def _render_top(top_items, col, metric, filename):
+    """Save a bar chart of the top products or stores by a metric."""
+    ax = _new_axes((12, 6))
+    top_items.plot(kind='bar', color='skyblue', ax=ax)
+    ax.set_title(f'Top 10 {col.split("_")[0].title()}s by {metric.capitalize()}')
+    ax.set_xlabel(col.replace('_', ' ').title())
+    ax.set_ylabel(metric.capitalize())
+    ax.grid(True, alpha=0.3, axis='y')
+    ax.figure.tight_layout()
+    ax.figure.savefig(filename)
+
+# Worker processes for _render_plots, at most one per figure plot_basic_insights makes. The pool
+# is started on first use and reused, since each worker has to import pandas and matplotlib;
+# shutdown_render_pool stops it, and runs at interpreter exit
+_RENDER_WORKERS = min(8, os.cpu_count() or 1)
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def _get_render_pool():
+    """Return the shared render pool, starting it on first use."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=_RENDER_WORKERS)
+        return _render_pool
+
+def shutdown_render_pool():
+    """Stop the render pool's worker processes; the next plot_basic_insights call starts a new pool."""
+    global _render_pool
+    with _render_pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+atexit.register(shutdown_render_pool)
+
+def _render_plots(jobs):
+    """
+    Render (renderer, args, message) jobs, printing each message once its figure is saved.
+    Rendering is CPU-bound, so figures are drawn in parallel worker processes when more
+    than one CPU is available, and in this process otherwise.
+    """
+    global _render_pool
+    if len(jobs) < 2 or _RENDER_WORKERS < 2:
+        for renderer, args, message in jobs:
+            renderer(*args)
+            print(message)
+        return
+    
+    pool = _get_render_pool()
+    try:
+        futures = [(pool.submit(renderer, *args), message) for renderer, args, message in jobs]
+        for future, message in futures:
+            future.result()
+            print(message)
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool on the next call
+        with _render_pool_lock:
+            if _render_pool is pool:
+                _render_pool = None
+        raise
 
 class RetailDataProcessor:
     """
@@ -12,23 +192,106 @@ class RetailDataProcessor:
     and perform basic analysis for the RetailPulse AI platform.
     """
     
-    def __init__(self, dataset_path=None):
+    def __init__(self, dataset_path=None, cache_dir=None):
         """
         Initialize the data processor with optional dataset path.
         
         Args:
             dataset_path (str, optional): Path to the dataset directory or file
+            cache_dir (str, optional): Directory caching loaded data and summary statistics; caching is off when None.
+                Cache files are unpickled, so entries in a directory other users can write to are ignored.
         """
         self.dataset_path = dataset_path
+        self.cache_dir = cache_dir
         self.data = None
         self.json_data = None
         self.summary_stats = {}
+        # (data, cache key) of the last successfully loaded file; the key is None when it is not cacheable
+        self._cache_key = None
+        # (data, parsed 'date' column) from the last _parse_dates call
+        self._date_cache = None
+        # (data, numeric column names, other column names) from the last _split_columns call
+        self._columns_cache = None
     
     def set_dataset_path(self, path):
         """Set the dataset path."""
         self.dataset_path = path
         print(f"Dataset path set to: {self.dataset_path}")
     
+    def _make_cache_key(self, path):
+        """Key a file's cache entries by its absolute path, mtime and size, the pandas version and the reader engines."""
+        st = os.stat(path)
+        key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{pd.__version__}|{_CSV_ENGINE}|{_EXCEL_ENGINE}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    
+    def _loaded_cache_key(self):
+        """Return the loaded file's cache key, or None once self.data is no longer the frame loaded from it."""
+        if self._cache_key is not None and self._cache_key[0] is self.data:
+            return self._cache_key[1]
+        return None
+    
+    @staticmethod
+    def _is_private(st):
+        """Whether a stat result belongs to the current user and is not writable by group or others."""
+        if not hasattr(os, 'getuid'):
+            return True
+        return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+    
+    def _cache_dir_is_private(self):
+        """Whether cache_dir is a real directory owned by the current user that no one else can write to."""
+        try:
+            st = os.lstat(self.cache_dir)
+        except OSError:
+            return False
+        return stat.S_ISDIR(st.st_mode) and self._is_private(st)
+    
+    def _read_cache(self, kind, key):
+        """Return the cached object of the given kind for a file's key, or None on a miss."""
+        if not self.cache_dir or not key or not os.path.lexists(self.cache_dir):
+            return None
+        if not self._cache_dir_is_private():
+            print(f"Warning: Ignoring cache directory {self.cache_dir}: not a private directory owned by this user")
+            return None
+        cache_file = os.path.join(self.cache_dir, f"{key}.{kind}.pkl")
+        try:
+            with open(cache_file, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if not stat.S_ISREG(st.st_mode) or not self._is_private(st):
+                    print(f"Warning: Ignoring cache file {cache_file}: not a private file owned by this user")
+                    return None
+                obj = pickle.load(f)
+            # Mark the entry as recently used for trimming
+            os.utime(cache_file)
+            return obj
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable cache file {cache_file}: {str(e)}")
+            return None
+    
+    def _write_cache(self, kind, key, obj):
+        """Cache an object for a file's key, then drop the least recently used entries."""
+        if not self.cache_dir or not key:
+            return
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            if not self._cache_dir_is_private():
+                print(f"Warning: Not caching to {self.cache_dir}: not a private directory owned by this user")
+                return
+            cache_file = os.path.join(self.cache_dir, f"{key}.{kind}.pkl")
+            # Write to a temporary name first so readers never see a partial file
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with os.fdopen(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+            
+            entries = sorted((e for e in os.scandir(self.cache_dir) if e.name.endswith('.pkl')),
+                             key=lambda e: e.stat().st_mtime)
+            for entry in entries[:-_CACHE_MAX_FILES]:
+                os.remove(entry.path)
+        except Exception as e:
+            print(f"Warning: Could not write cache: {str(e)}")
+    
     def load_data(self, file_path=None):
         """
         Load data from a file (CSV, JSON, Excel) and validate its structure.
@@ -48,23 +311,38 @@ class RetailDataProcessor:
         file_ext = os.path.splitext(path)[1].lower()
         
         try:
+            # An unchanged file is restored from the cache without parsing or validating it again
+            cache_key = self._make_cache_key(path) if self.cache_dir and os.path.isfile(path) else None
+            # Until this load succeeds nothing is cached under either the old or the new file's key
+            self._cache_key = None
+            cached = self._read_cache('data', cache_key)
+            if cached is not None:
+                self.data, self.json_data = cached
+                self._cache_key = (self.data, cache_key)
+                print(f"Loaded {path} from cache")
+                return True
+            
             print(f"Loading data from {path}...")
+            self.data = None
+            self.json_data = None
             
             if file_ext == '.csv':
-                self.data = pd.read_csv(path)
+                self.data = pd.read_csv(path, engine=_CSV_ENGINE)
                 print(f"Loaded CSV with {len(self.data)} rows and {len(self.data.columns)} columns")
                 
             elif file_ext == '.json':
-                # Read the file as text first to validate JSON structure
-                with open(path, 'r', encoding='utf-8') as f:
-                    json_text = f.read()
-                    
-                # Try to fix any JSON issues
-                fixed_json = fix_json_response(json_text)
+                with open(path, 'rb') as f:
+                    json_bytes = f.read()
+                
+                # Parse well-formed files directly. Malformed ones only load when a fenced block
+                # or, with json5 installed, lenient JSON actually parses; the LLM plan repair in
+                # fix_json_response would invent placeholder data for a truncated dataset
+                try:
+                    self.json_data = fast_loads(json_bytes)
+                except json.JSONDecodeError:
+                    self.json_data = parse_llm_json(json_bytes.decode('utf-8'))
                 
-                # Now parse as JSON
-                if fixed_json:
-                    self.json_data = json.loads(fixed_json)
+                if self.json_data is not None:
                     print(f"Successfully parsed JSON with {len(self.json_data)} top-level elements")
                     
                     # If it's a list of records, convert to dataframe
@@ -83,7 +361,7 @@ class RetailDataProcessor:
                     return False
                 
             elif file_ext in ['.xlsx', '.xls']:
-                self.data = pd.read_excel(path)
+                self.data = pd.read_excel(path, engine=_EXCEL_ENGINE)
                 print(f"Loaded Excel with {len(self.data)} rows and {len(self.data.columns)} columns")
                 
             else:
@@ -91,12 +369,40 @@ class RetailDataProcessor:
                 return False
                 
             self._validate_data()
+            self._cache_key = (self.data, cache_key)
+            self._write_cache('data', cache_key, (self.data, self.json_data))
             return True
             
         except Exception as e:
             print(f"Error loading data: {str(e)}")
             return False
     
+    def _parse_dates(self):
+        """
+        Parse the 'date' column to datetimes with a detected format and pandas' parse cache.
+        The result is reused until different data is loaded.
+        """
+        if self._date_cache is not None and self._date_cache[0] is self.data:
+            return self._date_cache[1]
+        dates = self.data['date']
+        parsed = pd.to_datetime(dates, format=_detect_date_format(dates), cache=True)
+        self._date_cache = (self.data, parsed)
+        return parsed
+    
+    def _split_columns(self):
+        """
+        Return the (numeric, non-numeric) column names of the loaded data, inspecting
+        the dtypes once. The result is reused until different data is loaded.
+        """
+        if self._columns_cache is not None and self._columns_cache[0] is self.data:
+            return self._columns_cache[1], self._columns_cache[2]
+        # The same test select_dtypes(include=[np.number]) applies, done in one pass over the dtypes
+        is_numeric = [issubclass(dtype.type, np.number) for dtype in self.data.dtypes]
+        numeric_cols = self.data.columns[is_numeric]
+        other_cols = self.data.columns[[not numeric for numeric in is_numeric]]
+        self._columns_cache = (self.data, numeric_cols, other_cols)
+        return numeric_cols, other_cols
+    
     def _validate_data(self):
         """Validate the data structure for retail inventory analysis."""
         if self.data is None:
@@ -148,6 +454,14 @@ class RetailDataProcessor:
             print("No data available for summary statistics")
             return
         
+        # Statistics for an unchanged file come from the cache, as long as self.data is still its frame
+        cache_key = self._loaded_cache_key()
+        cached = self._read_cache('summary', cache_key)
+        if cached is not None:
+            self.summary_stats = cached
+            print("\nLoaded summary statistics from cache")
+            return self.summary_stats
+        
         print("\nGenerating summary statistics...")
         
         # Basic dataset info
@@ -155,33 +469,42 @@ class RetailDataProcessor:
         self.summary_stats['column_count'] = len(self.data.columns)
         self.summary_stats['columns'] = list(self.data.columns)
         
-        # Numeric columns stats
-        numeric_cols = self.data.select_dtypes(include=[np.number]).columns
-        self.summary_stats['numeric_columns'] = {}
-        
-        for col in numeric_cols:
-            self.summary_stats['numeric_columns'][col] = {
-                'min': float(self.data[col].min()),
-                'max': float(self.data[col].max()),
-                'mean': float(self.data[col].mean()),
-                'median': float(self.data[col].median()),
-                'std': float(self.data[col].std()),
-                'missing': int(self.data[col].isnull().sum())
+        # Numeric columns stats, each reduced over all numeric columns at once
+        numeric_cols, cat_cols = self._split_columns()
+        numeric_data = self.data[numeric_cols]
+        mins, maxs = numeric_data.min(), numeric_data.max()
+        means, medians, stds = numeric_data.mean(), numeric_data.median(), numeric_data.std()
+        missing = numeric_data.isnull().sum()
+        
+        self.summary_stats['numeric_columns'] = {
+            col: {
+                'min': float(mins[col]),
+                'max': float(maxs[col]),
+                'mean': float(means[col]),
+                'median': float(medians[col]),
+                'std': float(stds[col]),
+                'missing': int(missing[col])
             }
+            for col in numeric_data.columns
+        }
         
         # Categorical columns stats
-        cat_cols = self.data.select_dtypes(exclude=[np.number]).columns
         self.summary_stats['categorical_columns'] = {}
         
         for col in cat_cols:
-            value_counts = self.data[col].value_counts().head(10).to_dict()
+            # Hash each value once into integer codes (-1 for missing); the top values, unique
+            # count and missing count all come from counting those codes
+            codes, uniques = pd.factorize(self.data[col])
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            # Ties keep the order in which the values first appear
+            top = np.argsort(-counts, kind='stable')[:10]
             # Convert keys to strings if they're not already
-            value_counts = {str(k): v for k, v in value_counts.items()}
+            value_counts = {str(uniques[i]): int(counts[i]) for i in top}
             
             self.summary_stats['categorical_columns'][col] = {
-                'unique_values': int(self.data[col].nunique()),
+                'unique_values': len(uniques),
                 'most_common': value_counts,
-                'missing': int(self.data[col].isnull().sum())
+                'missing': int(len(codes) - counts.sum())
             }
         
         # Store/product stats if available
@@ -196,24 +519,26 @@ class RetailDataProcessor:
             # Convert to datetime if it's not already
             if not pd.api.types.is_datetime64_dtype(self.data['date']):
                 try:
-                    date_series = pd.to_datetime(self.data['date'])
-                    self.summary_stats['date_range'] = {
-                        'start': date_series.min().strftime('%Y-%m-%d'),
-                        'end': date_series.max().strftime('%Y-%m-%d'),
-                        'days': (date_series.max() - date_series.min()).days
-                    }
+                    self.summary_stats['date_range'] = self._date_range(self._parse_dates())
                 except:
                     print("Warning: Could not convert 'date' column to datetime")
             else:
-                self.summary_stats['date_range'] = {
-                    'start': self.data['date'].min().strftime('%Y-%m-%d'),
-                    'end': self.data['date'].max().strftime('%Y-%m-%d'),
-                    'days': (self.data['date'].max() - self.data['date'].min()).days
-                }
+                self.summary_stats['date_range'] = self._date_range(self.data['date'])
         
+        self._write_cache('summary', cache_key, self.summary_stats)
         print("Summary statistics generated successfully")
         return self.summary_stats
     
+    @staticmethod
+    def _date_range(dates):
+        """Summarize a datetime Series' first and last dates, scanning it once for each."""
+        start, end = dates.min(), dates.max()
+        return {
+            'start': start.strftime('%Y-%m-%d'),
+            'end': end.strftime('%Y-%m-%d'),
+            'days': (end - start).days
+        }
+    
     def plot_basic_insights(self, output_dir='./static/images/analysis'):
         """
         Generate basic plots for insights and save them to the specified directory.
@@ -229,70 +554,50 @@ class RetailDataProcessor:
         os.makedirs(output_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Figures are prepared here and rendered in parallel at the end
+        jobs = []
         
         # Plot 1: Distribution of numeric values
-        numeric_cols = self.data.select_dtypes(include=[np.number]).columns
+        numeric_cols = self._split_columns()[0]
         if len(numeric_cols) > 0:
             for col in numeric_cols[:5]:  # Limit to first 5 numeric columns
-                plt.figure(figsize=(10, 6))
-                plt.hist(self.data[col].dropna(), bins=20, alpha=0.7)
-                plt.title(f'Distribution of {col}')
-                plt.xlabel(col)
-                plt.ylabel('Frequency')
-                plt.grid(True, alpha=0.3)
-                
                 filename = f"{output_dir}/hist_{col}_{timestamp}.png"
-                plt.savefig(filename)
-                plt.close()
-                print(f"Saved histogram for {col} to {filename}")
+                # Only the bin counts are sent to the renderer, not the column
+                jobs.append((_render_hist, (col, *_histogram(self.data[col]), filename),
+                             f"Saved histogram for {col} to {filename}"))
         
         # Plot 2: Time series if date column exists
         if 'date' in self.data.columns and any(col in self.data.columns for col in ['quantity', 'sales']):
             # Convert to datetime if needed
             if not pd.api.types.is_datetime64_dtype(self.data['date']):
                 try:
-                    self.data['date'] = pd.to_datetime(self.data['date'])
+                    self.data['date'] = self._parse_dates()
                 except:
                     print("Warning: Could not convert 'date' column to datetime for time series plot")
+                    _render_plots(jobs)
                     return
             
             # Choose which metric to plot
             metric = 'quantity' if 'quantity' in self.data.columns else 'sales'
             
-            # Group by date and sum the metric
-            time_series = self.data.groupby('date')[metric].sum().reset_index()
-            
-            plt.figure(figsize=(12, 6))
-            plt.plot(time_series['date'], time_series[metric], marker='o', linestyle='-', alpha=0.7)
-            plt.title(f'Time Series of {metric.capitalize()} Over Time')
-            plt.xlabel('Date')
-            plt.ylabel(metric.capitalize())
-            plt.grid(True, alpha=0.3)
-            plt.xticks(rotation=45)
-            plt.tight_layout()
+            # Sum the metric per day over a sorted DatetimeIndex instead of hashing every date;
+            # days without data are dropped rather than plotted as zero
+            daily = pd.Series(self.data[metric].to_numpy(), index=pd.DatetimeIndex(self.data['date']))
+            time_series = daily.resample('D').sum(min_count=1).dropna()
             
             filename = f"{output_dir}/timeseries_{metric}_{timestamp}.png"
-            plt.savefig(filename)
-            plt.close()
-            print(f"Saved time series plot for {metric} to {filename}")
+            jobs.append((_render_timeseries, (time_series, metric, filename),
+                         f"Saved time series plot for {metric} to {filename}"))
         
         # Plot 3: Top products/stores
         for col, metric in [('product_id', 'quantity'), ('store_id', 'quantity')]:
             if col in self.data.columns and metric in self.data.columns:
-                top_items = self.data.groupby(col)[metric].sum().sort_values(ascending=False).head(10)
-                
-                plt.figure(figsize=(12, 6))
-                top_items.plot(kind='bar', color='skyblue')
-                plt.title(f'Top 10 {col.split("_")[0].title()}s by {metric.capitalize()}')
-                plt.xlabel(col.replace('_', ' ').title())
-                plt.ylabel(metric.capitalize())
-                plt.grid(True, alpha=0.3, axis='y')
-                plt.tight_layout()
+                top_items = _top_totals(self.data[col], self.data[metric])
                 
                 filename = f"{output_dir}/top_{col}_{timestamp}.png"
-                plt.savefig(filename)
-                plt.close()
-                print(f"Saved top {col} plot to {filename}")
+                jobs.append((_render_top, (top_items, col, metric, filename), f"Saved top {col} plot to {filename}"))
+        
+        _render_plots(jobs)
     
     def export_summary_to_json(self, output_file='dataset_summary.json'):
         """Export the summary statistics to a JSON file."""
@@ -309,6 +614,30 @@ class RetailDataProcessor:
             print(f"Error exporting summary statistics: {str(e)}")
             return False
 
+def _iter_files(directory_path):
+    """
+    Yield the DirEntry of every non-directory under directory_path in os.walk's
+    top-down order, without following symlinked directories. Unreadable
+    directories are skipped.
+    """
+    try:
+        with os.scandir(directory_path) as it:
+            entries = list(it)
+    except OSError:
+        return
+    subdirs = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if not is_dir:
+            yield entry
+        elif not entry.is_symlink():
+            subdirs.append(entry.path)
+    for subdir in subdirs:
+        yield from _iter_files(subdir)
+
 def scan_dataset_directory(directory_path):
     """
     Scan a directory for potential dataset files and return a list of file paths.
@@ -319,7 +648,7 @@ def scan_dataset_directory(directory_path):
     Returns:
         list: List of file paths found in the directory
     """
-    valid_extensions = ['.csv', '.json', '.xlsx', '.xls']
+    valid_extensions = frozenset({'.csv', '.json', '.xlsx', '.xls'})
     dataset_files = []
     
     if not os.path.exists(directory_path):
@@ -328,20 +657,20 @@ def scan_dataset_directory(directory_path):
     
     print(f"Scanning directory: {directory_path}")
     
-    for root, dirs, files in os.walk(directory_path):
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_ext = os.path.splitext(file)[1].lower()
-            
-            if file_ext in valid_extensions:
-                rel_path = os.path.relpath(file_path, directory_path)
-                dataset_files.append({
-                    'path': file_path,
-                    'relative_path': rel_path,
-                    'type': file_ext[1:],  # Remove the dot
-                    'size': os.path.getsize(file_path) / (1024 * 1024),  # Size in MB
-                    'modified': datetime.fromtimestamp(os.path.getmtime(file_path)).strftime('%Y-%m-%d %H:%M:%S')
-                })
+    for entry in _iter_files(directory_path):
+        file_ext = os.path.splitext(entry.name)[1].lower()
+        
+        if file_ext in valid_extensions:
+            # One stat call for both the size and the modification time
+            st = entry.stat()
+            rel_path = os.path.relpath(entry.path, directory_path)
+            dataset_files.append({
+                'path': entry.path,
+                'relative_path': rel_path,
+                'type': file_ext[1:],  # Remove the dot
+                'size': st.st_size / (1024 * 1024),  # Size in MB
+                'modified': datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+            })
     
     print(f"Found {len(dataset_files)} potential dataset files")
     return dataset_files
@@ -362,7 +691,7 @@ if __name__ == "__main__":
             print(f"{i}. {file_info['relative_path']} ({file_info['type']}, {file_info['size']:.2f} MB)")
         
         # Process the first dataset found
-        processor = RetailDataProcessor()
+        processor = RetailDataProcessor(cache_dir=_CACHE_DIR)
         processor.set_dataset_path(dataset_files[0]['path'])
         
         if processor.load_data():
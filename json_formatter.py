@@ -1,55 +1,193 @@
 import json
+import logging
 import re
 
+try:
+    # orjson is optional; it parses and serializes several times faster than the standard library.
+    # Its JSONDecodeError subclasses json.JSONDecodeError, so callers handle both alike.
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    fast_loads = orjson.loads
+
+    def fast_dumps(obj, indent=False):
+        """Serialize obj to a JSON string, using str() for values JSON cannot represent."""
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=str, option=option).decode()
+else:
+    fast_loads = json.loads
+
+    def fast_dumps(obj, indent=False):
+        """Serialize obj to a JSON string, using str() for values JSON cannot represent."""
+        return json.dumps(obj, indent=2 if indent else None, default=str)
+
+try:
+    # json5 is optional; it accepts the single quotes, unquoted keys and trailing commas LLMs emit
+    import json5
+except ImportError:
+    json5 = None
+
+logger = logging.getLogger(__name__)
+
+# Characters that can change bracket depth or string state while scanning for JSON
+_STRUCTURAL_RE = re.compile(r'[{}"\\]')
+
+# A fenced code block holding a single JSON object or array
+_FENCE_RE = re.compile(r'```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```', re.DOTALL)
+
+# String, number and boolean tokens of json.dumps output, for terminal syntax highlighting
+_JSON_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false')
+
+# Repair steps of fix_json_response
+_CODE_BLOCK_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```', re.DOTALL)
+_JSON_OBJ_RE = re.compile(r'(\{(?:[^{}]|(?:\{[^{}]*\}))*\})', re.DOTALL)
+_UNQUOTED_KEY_RE = re.compile(r'([{,])\s*(\w+):')
+_TRAILING_COMMA_OBJ_RE = re.compile(r',\s*}')
+_TRAILING_COMMA_ARR_RE = re.compile(r',\s*]')
+
+# Decoder for the valid JSON objects embedded in otherwise malformed responses
+_DECODER = json.JSONDecoder()
+
+# Optimization plan keys fix_json_response rebuilds a response from, and the pattern finding each value
+_EXPECTED_KEYS = (
+    "demand_forecast", 
+    "optimal_inventory_level", 
+    "pricing_strategy", 
+    "order_recommendations", 
+    "key_actions", 
+    "projected_impact"
+)
+_EXPECTED_KEY_RES = {
+    key: re.compile(fr'"{key}"\s*:\s*(.+?)(?:,\s*"|\s*\}})', re.DOTALL | re.IGNORECASE)
+    for key in _EXPECTED_KEYS
+}
+
+def _colorize_json(formatted):
+    """
+    Wrap each token of json.dumps output in its ANSI color in a single pass:
+    keys blue, strings green, numbers yellow and booleans purple.
+    """
+    def color(match):
+        token = match.group()
+        if token[0] == '"':
+            # A string directly followed by a colon is an object key
+            code = '34' if formatted.startswith(':', match.end()) else '32'
+        elif token[0] in 'tf':
+            code = '35'
+        else:
+            code = '33'
+        return f'\033[{code}m{token}\033[0m'
+    return _JSON_TOKEN_RE.sub(color, formatted)
+
 def format_json_output(json_obj):
     """
     Takes a JSON object and formats it with proper syntax highlighting
     for the terminal output.
     """
     if isinstance(json_obj, dict):
-        formatted = json.dumps(json_obj, indent=2)
         # Add color syntax highlighting for terminal
-        # Keys in blue
-        formatted = re.sub(r'"([^"]+)":', r'\033[34m"\1"\033[0m:', formatted)
-        # Strings in green
-        formatted = re.sub(r': "([^"]+)"', r': \033[32m"\1"\033[0m', formatted)
-        # Numbers in yellow
-        formatted = re.sub(r': (\d+)', r': \033[33m\1\033[0m', formatted)
-        # Booleans in purple
-        formatted = re.sub(r': (true|false)', r': \033[35m\1\033[0m', formatted)
-        return formatted
+        return _colorize_json(json.dumps(json_obj, indent=2))
     elif json_obj is None:
         return "\033[31mNone\033[0m"
     else:
         return str(json_obj)
 
+def iter_json_candidates(text):
+    """
+    Yield (start, end) spans of balanced {...} regions in text using a single
+    linear scan. Braces inside JSON string literals are ignored, and nested
+    regions are yielded before the region that encloses them.
+    """
+    starts = []
+    in_string = False
+    skip = -1
+    # Only visit characters that can affect the scan state
+    for match in _STRUCTURAL_RE.finditer(text):
+        i = match.start()
+        if i == skip:
+            continue
+        ch = text[i]
+        if in_string:
+            if ch == '\\':
+                skip = i + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '{':
+            starts.append(i)
+        elif ch == '}':
+            if starts:
+                yield starts.pop(), i + 1
+        elif ch == '"' and starts:
+            in_string = True
+
+def parse_llm_json(text):
+    """
+    Parse an LLM response with a cheap-to-expensive ladder: the text as JSON, the
+    text after a bare "json" language tag as JSON, the first fenced code block as
+    JSON, then either of them as JSON5 when json5 is installed. Returns None when
+    none of these succeed.
+    """
+    try:
+        return fast_loads(text)
+    except json.JSONDecodeError:
+        pass
+    
+    # Some models prefix the JSON with the code fence's language tag but leave out the fence
+    stripped = text.lstrip()
+    if stripped[:4].lower() == 'json':
+        try:
+            return fast_loads(stripped[4:])
+        except json.JSONDecodeError:
+            pass
+    
+    fence = _FENCE_RE.search(text)
+    if fence:
+        try:
+            return fast_loads(fence.group(1))
+        except json.JSONDecodeError:
+            pass
+    
+    if json5 is not None:
+        try:
+            return json5.loads(fence.group(1) if fence else text)
+        except ValueError:
+            pass
+    return None
+
 def fix_json_response(text):
     """
     Attempts to fix common JSON formatting issues in LLM responses.
-    Returns the fixed JSON object if successful, None otherwise.
+    Returns the fixed JSON object, or when nothing parses, an object rebuilt
+    from the expected optimization plan keys.
     """
-    print(f"Original response length: {len(text)}")
+    logger.debug("Original response length: %d", len(text))
+    
+    # Well-formed responses need none of the repairs below
+    json_obj = parse_llm_json(text)
+    if json_obj is not None:
+        logger.debug("Parsed JSON without repairs")
+        return json_obj
     
     # 1. Try to extract JSON from markdown code blocks
-    code_block_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-    code_blocks = re.findall(code_block_pattern, text, re.DOTALL)
+    code_blocks = _CODE_BLOCK_RE.findall(text)
     
     if code_blocks:
-        print(f"Found {len(code_blocks)} markdown code blocks")
+        logger.debug("Found %d markdown code blocks", len(code_blocks))
         for i, block in enumerate(code_blocks):
-            print(f"\nTrying code block {i+1}:")
             clean_block = block.strip()
             try:
                 json_obj = json.loads(clean_block)
-                print(f"Successfully parsed JSON from code block {i+1}")
+                logger.debug("Successfully parsed JSON from code block %d", i + 1)
                 return json_obj
             except json.JSONDecodeError as e:
-                print(f"JSON decode error in block {i+1}: {str(e)}")
-                print(f"Block preview: {clean_block[:100]}...")
+                logger.debug("JSON decode error in block %d: %s; block preview: %.100s...", i + 1, e, clean_block)
     
     # 2. Look for patterns like {...} (longest match)
-    json_pattern = r'(\{(?:[^{}]|(?:\{[^{}]*\}))*\})'
-    json_matches = re.finditer(json_pattern, text, re.DOTALL)
+    json_matches = _JSON_OBJ_RE.finditer(text)
     
     best_match = None
     best_match_len = 0
@@ -61,150 +199,119 @@ def fix_json_response(text):
             best_match_len = len(potential_json)
     
     if best_match:
-        print(f"\nFound JSON-like pattern with length {best_match_len}")
-        print(f"Pattern preview: {best_match[:100]}...")
+        logger.debug("Found JSON-like pattern with length %d; pattern preview: %.100s...", best_match_len, best_match)
         try:
             json_obj = json.loads(best_match)
-            print("Successfully parsed JSON from regex pattern.")
+            logger.debug("Successfully parsed JSON from regex pattern")
             return json_obj
         except json.JSONDecodeError as e:
-            print(f"JSON decode error: {str(e)}")
+            logger.debug("JSON decode error: %s", e)
     
-    # 3. Try parsing the raw text first (sometimes LLMs return valid JSON directly)
-    try:
-        json_obj = json.loads(text)
-        print("Entire response is valid JSON!")
-        return json_obj
-    except json.JSONDecodeError:
-        pass
-    
-    # 4. Try some common fixes
-    print("\nAttempting to fix common JSON issues...")
+    # 3. Try some common fixes
+    logger.debug("Attempting to fix common JSON issues...")
     fixed_text = text
     
     # Fix unquoted keys
-    fixed_text = re.sub(r'([{,])\s*(\w+):', r'\1"\2":', fixed_text)
+    fixed_text = _UNQUOTED_KEY_RE.sub(r'\1"\2":', fixed_text)
     
     # Fix single quotes
     fixed_text = fixed_text.replace("'", '"')
     
     # Fix trailing commas in arrays and objects
-    fixed_text = re.sub(r',\s*}', '}', fixed_text)
-    fixed_text = re.sub(r',\s*]', ']', fixed_text)
+    fixed_text = _TRAILING_COMMA_OBJ_RE.sub('}', fixed_text)
+    fixed_text = _TRAILING_COMMA_ARR_RE.sub(']', fixed_text)
     
     try:
         json_obj = json.loads(fixed_text)
-        print("Successfully fixed JSON issues!")
+        logger.debug("Successfully fixed JSON issues")
         return json_obj
     except json.JSONDecodeError as e:
-        print(f"Still couldn't parse JSON after fixes: {str(e)}")
-    
-    # 5. If we've reached here, attempt to build a valid JSON object from scratch
-    print("\nAttempting to construct JSON from scratch...")
-    
-    # Define expected keys based on errors in the UI
-    expected_keys = [
-        "demand_forecast", 
-        "optimal_inventory_level", 
-        "pricing_strategy", 
-        "order_recommendations", 
-        "key_actions", 
-        "projected_impact"
-    ]
-    
-    # Try to extract values for each expected key
-    constructed_json = {}
+        logger.debug("Still couldn't parse JSON after fixes: %s", e)
+    
+    # 4. If we've reached here, attempt to build a valid JSON object from scratch
+    logger.debug("Attempting to construct JSON from scratch...")
     
-    for key in expected_keys:
-        key_pattern = fr'"{key}"\s*:\s*(.+?)(?:,\s*"|\s*\}})'
-        key_match = re.search(key_pattern, text, re.DOTALL | re.IGNORECASE)
-        
-        if key_match:
-            value = key_match.group(1).strip()
+    # Take expected keys from the valid JSON objects among the balanced {...} spans, outermost
+    # first from left to right; spans inside an object already decoded are skipped, and the
+    # first object holding a key supplies its value, already parsed
+    constructed_json = {}
+    decoded_any = False
+    decoded_end = -1
+    for start, _ in sorted(iter_json_candidates(text), key=lambda span: (span[0], -span[1])):
+        if start < decoded_end:
+            continue
+        try:
+            obj, decoded_end = _DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            continue
+        decoded_any = True
+        for key in _EXPECTED_KEYS:
+            if key in obj and key not in constructed_json:
+                constructed_json[key] = obj[key]
+    if decoded_any:
+        logger.debug("Found %d expected keys in valid JSON fragments", len(constructed_json))
+    else:
+        # Without any valid fragment, try to extract a value for each expected key (based on errors in the UI)
+        for key, key_re in _EXPECTED_KEY_RES.items():
+            key_match = key_re.search(text)
             
-            # Try to determine value type and parse it appropriately
-            if value.startswith('"') and value.endswith('"'):
-                # String value
-                constructed_json[key] = value[1:-1]
-            elif value.startswith('{') and value.endswith('}'):
-                # Nested object
-                try:
-                    constructed_json[key] = json.loads(value)
-                except json.JSONDecodeError:
-                    # If parsing fails, use as string
+            if key_match:
+                value = key_match.group(1).strip()
+                
+                # Try to determine value type and parse it appropriately
+                if value.startswith('"') and value.endswith('"'):
+                    # String value
+                    constructed_json[key] = value[1:-1]
+                elif value.startswith('{') and value.endswith('}'):
+                    # Nested object
+                    try:
+                        constructed_json[key] = json.loads(value)
+                    except json.JSONDecodeError:
+                        # If parsing fails, use as string
+                        constructed_json[key] = {"value": value}
+                elif value.startswith('[') and value.endswith(']'):
+                    # Array
+                    try:
+                        constructed_json[key] = json.loads(value)
+                    except json.JSONDecodeError:
+                        # If parsing fails, use as string
+                        constructed_json[key] = {"items": value}
+                else:
+                    # Default to string if type is unclear
                     constructed_json[key] = {"value": value}
-            elif value.startswith('[') and value.endswith(']'):
-                # Array
-                try:
-                    constructed_json[key] = json.loads(value)
-                except json.JSONDecodeError:
-                    # If parsing fails, use as string
-                    constructed_json[key] = {"items": value}
-            else:
-                # Default to string if type is unclear
-                constructed_json[key] = {"value": value}
     
     # Add fallback for missing keys
-    for key in expected_keys:
+    for key in _EXPECTED_KEYS:
         if key not in constructed_json:
             # Create default placeholder for missing data
             constructed_json[key] = {"error": "No data found for the specified product and store"}
     
-    if constructed_json:
-        print(f"Created constructed JSON with {len(constructed_json)} keys")
-        return constructed_json
-    
-    # 6. More aggressive approach: Try to extract the longest valid JSON substring
-    print("\nTrying aggressive JSON extraction...")
-    
-    best_json = None
-    for i in range(len(text)):
-        for j in range(i + 1, len(text) + 1):
-            substr = text[i:j]
-            if substr.startswith('{') and substr.endswith('}'):
-                try:
-                    json_obj = json.loads(substr)
-                    if best_json is None or len(substr) > len(best_json):
-                        best_json = substr
-                except json.JSONDecodeError:
-                    continue
-    
-    if best_json:
-        print(f"Found valid JSON substring of length {len(best_json)}")
-        return json.loads(best_json)
-    
-    print("Failed to extract any valid JSON. Returning None.")
-    return None
+    logger.debug("Created constructed JSON with %d keys", len(constructed_json))
+    return constructed_json
 
 def process_llm_response(response_text):
     """
     Process an LLM response to extract and format valid JSON.
-    Prints detailed diagnostic information.
+    Logs detailed diagnostic information at DEBUG level.
     """
-    print("=" * 60)
-    print("PROCESSING LLM RESPONSE")
-    print("=" * 60)
-    
-    print(f"\nResponse preview (first 300 chars):")
-    print("-" * 60)
-    print(response_text[:300] + "..." if len(response_text) > 300 else response_text)
-    print("-" * 60)
+    logger.debug("Processing LLM response, preview (first 300 chars):\n%.300s%s",
+                 response_text, "..." if len(response_text) > 300 else "")
     
     # Try to extract and fix JSON
     json_obj = fix_json_response(response_text)
     
-    print("\nEXTRACTED JSON RESULT:")
-    print("-" * 60)
-    if json_obj:
-        print(format_json_output(json_obj))
-    else:
-        print("No valid JSON found in the response")
-    print("-" * 60)
+    # Highlighting the result is only worth doing when it is logged
+    if logger.isEnabledFor(logging.DEBUG):
+        if json_obj:
+            logger.debug("Extracted JSON result:\n%s", format_json_output(json_obj))
+        else:
+            logger.debug("No valid JSON found in the response")
     
     return json_obj
 
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     print("JSON Formatter Utility")
     print("This script can be imported by llm_test.py to help format and fix JSON responses")
     
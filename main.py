@@ -1,7 +1,7 @@
 import os
 import json
+import logging
 import sqlite3
-import pandas as pd
 from agent_framework import (
     DemandForecastAgent,
     InventoryMonitorAgent,
@@ -9,6 +9,7 @@ from agent_framework import (
     SupplyChainAgent,
     CoordinatorAgent
 )
+from create_database import DB_PATH, ensure_database
 
 # Set environment variables for LLM service with the specific URL and model
 os.environ['LLM_URL'] = 'http://35.154.211.247:11434'
@@ -33,26 +34,64 @@ def setup_multi_agent_system():
     
     return coordinator
 
+_TOP_PRODUCTS_SQL = """
+SELECT 
+    df."Product ID",
+    df."Store ID",
+    SUM(df."Sales Quantity") as total_sales
+FROM 
+    demand_forecasting df
+GROUP BY 
+    df."Product ID", df."Store ID"
+ORDER BY 
+    total_sales DESC
+LIMIT ?
+"""
+
+_CRITICAL_INVENTORY_SQL = """
+SELECT 
+    im."Product ID",
+    im."Store ID",
+    im."Stock Levels",
+    im."Reorder Point",
+    df."Sales Quantity"
+FROM 
+    inventory_monitoring im
+LEFT JOIN 
+    demand_forecasting df ON im."Product ID" = df."Product ID" AND im."Store ID" = df."Store ID"
+WHERE 
+    im."Stock Levels" < im."Reorder Point"
+ORDER BY 
+    (im."Reorder Point" - im."Stock Levels") DESC
+LIMIT ?
+"""
+
+# Connection shared by the queries below, opened on first use so that importing this
+# module never creates an empty database file before ensure_database() runs
+_db_conn = None
+
+def get_connection():
+    """Return the shared SQLite connection, opening it on first use."""
+    global _db_conn
+    if _db_conn is None:
+        _db_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        for pragma in ('cache_size=-20000', 'temp_store=MEMORY', 'mmap_size=268435456'):
+            _db_conn.execute(f'PRAGMA {pragma}')
+    return _db_conn
+
+def query_records(sql, params=()):
+    """Run a query and return its rows as a list of column -> value dicts."""
+    cursor = get_connection().execute(sql, params)
+    try:
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
 def get_top_products_by_sales(limit=5):
     """Get the top products by sales volume."""
     try:
-        conn = sqlite3.connect('database/retail_inventory.db')
-        query = """
-        SELECT 
-            df."Product ID",
-            df."Store ID",
-            SUM(df."Sales Quantity") as total_sales
-        FROM 
-            demand_forecasting df
-        GROUP BY 
-            df."Product ID", df."Store ID"
-        ORDER BY 
-            total_sales DESC
-        LIMIT ?
-        """
-        df = pd.read_sql_query(query, conn, params=(limit,))
-        conn.close()
-        return df.to_dict('records')
+        return query_records(_TOP_PRODUCTS_SQL, (limit,))
     except Exception as e:
         print(f"Error getting top products: {str(e)}")
         return []
@@ -60,27 +99,7 @@ def get_top_products_by_sales(limit=5):
 def find_critical_inventory_products(limit=5):
     """Find products with critical inventory levels."""
     try:
-        conn = sqlite3.connect('database/retail_inventory.db')
-        query = """
-        SELECT 
-            im."Product ID",
-            im."Store ID",
-            im."Stock Levels",
-            im."Reorder Point",
-            df."Sales Quantity"
-        FROM 
-            inventory_monitoring im
-        LEFT JOIN 
-            demand_forecasting df ON im."Product ID" = df."Product ID" AND im."Store ID" = df."Store ID"
-        WHERE 
-            im."Stock Levels" < im."Reorder Point"
-        ORDER BY 
-            (im."Reorder Point" - im."Stock Levels") DESC
-        LIMIT ?
-        """
-        df = pd.read_sql_query(query, conn, params=(limit,))
-        conn.close()
-        return df.to_dict('records')
+        return query_records(_CRITICAL_INVENTORY_SQL, (limit,))
     except Exception as e:
         print(f"Error finding critical inventory products: {str(e)}")
         return []
@@ -88,9 +107,7 @@ def find_critical_inventory_products(limit=5):
 def run_optimization_example():
     """Run an example of the multi-agent optimization system."""
     # Create database if it doesn't exist
-    if not os.path.exists('database/retail_inventory.db'):
-        # Run the create_database.py script directly
-        os.system('python create_database.py')
+    ensure_database()
     
     # Setup multi-agent system
     coordinator = setup_multi_agent_system()
@@ -100,27 +117,20 @@ def run_optimization_example():
     top_products = get_top_products_by_sales(limit=3)
     critical_products = find_critical_inventory_products(limit=3)
     
-    # Process top selling products
-    print("\n=== Optimizing Top Selling Products ===")
-    for product in top_products:
-        product_id = product["Product ID"]
-        store_id = product["Store ID"]
-        print(f"\nOptimizing Product ID: {product_id} at Store ID: {store_id} (High Sales Volume)")
-        
-        optimization_plan = coordinator.process(product_id, store_id)
-        
-        print(f"Optimization Plan: {json.dumps(optimization_plan, indent=2)}")
+    # Coordinate every product in one batch: one query for all their rows and concurrent LLM calls
+    sections = [
+        ("Top Selling Products", "High Sales Volume", top_products),
+        ("Critical Inventory Products", "Critical Inventory", critical_products)
+    ]
+    pairs = [(product["Product ID"], product["Store ID"]) for _, _, products in sections for product in products]
+    plans = iter(coordinator.process_batch(pairs))
     
-    # Process critical inventory products
-    print("\n=== Optimizing Critical Inventory Products ===")
-    for product in critical_products:
-        product_id = product["Product ID"]
-        store_id = product["Store ID"]
-        print(f"\nOptimizing Product ID: {product_id} at Store ID: {store_id} (Critical Inventory)")
-        
-        optimization_plan = coordinator.process(product_id, store_id)
-        
-        print(f"Optimization Plan: {json.dumps(optimization_plan, indent=2)}")
+    for title, reason, products in sections:
+        print(f"\n=== Optimizing {title} ===")
+        for product in products:
+            print(f"\nOptimizing Product ID: {product['Product ID']} at Store ID: {product['Store ID']} ({reason})")
+            print(f"Optimization Plan: {json.dumps(next(plans), indent=2)}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     run_optimization_example() 
\ No newline at end of file